@@ -0,0 +1,102 @@
+"""
+Binary format benchmark: compare the size and the write and read times of the binary format (see Packer)
+with the text formats, on a synthetic graph shaped like a magician export.
+
+Usage (from the repository root): PYTHONPATH=. python benchmarks/binary_format.py [--triples N] [--formats xml turtle nt binary]
+"""
+
+import argparse
+import io
+import random
+import time
+
+from rdflib import Graph, Literal, URIRef
+from rdflib.namespace import RDF, XSD
+
+from magician.helpers.packer import Packer, Unpacker
+
+
+def synthetic_graph(triples: int) -> Graph:
+    """
+    Create a graph of entities with a type, some literals (plain, with language and with datatype)
+    and references to a few shared entities.
+    """
+
+    random.seed(0)
+
+    ns = "https://example.org/"
+    schema = "https://schema.org/"
+
+    g = Graph()
+    g.bind("", ns)
+    g.bind("schema", schema)
+
+    entity = 0
+    while len(g) < triples:
+        subject = URIRef("{}person/{}".format(ns, entity))
+        g.add((subject, RDF.type, URIRef(schema + "Person")))
+        g.add((subject, URIRef(schema + "name"), Literal("Person {}".format(entity))))
+        g.add((subject, URIRef(schema + "description"), Literal("Descrizione {}".format(entity), lang="it")))
+        g.add((subject, URIRef(schema + "birthDate"), Literal("19{:02d}-01-01".format(entity % 100), datatype=XSD.date)))
+        g.add((subject, URIRef(schema + "address"), URIRef("{}city/{}".format(ns, random.randrange(100)))))
+        entity += 1
+
+    return g
+
+
+def write(g: Graph, format: str) -> bytes:
+    if format == "binary":
+        fp = io.BytesIO()
+        with Packer(fp) as packer:
+            for triple in g:
+                packer.add(triple)
+
+        return fp.getvalue()
+
+    return g.serialize(format=format, encoding="utf-8")
+
+
+def read(data: bytes, format: str) -> int:
+    if format == "binary":
+        return len(Unpacker(io.BytesIO(data)).to_graph())
+
+    return len(Graph().parse(data=data, format=format))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--triples", type=int, default=100000, help="number of triples (default: 100000)")
+    parser.add_argument("--formats", nargs="+", default=["xml", "turtle", "nt", "binary"],
+                        help="formats to compare (default: xml turtle nt binary)")
+    args = parser.parse_args()
+
+    g = synthetic_graph(args.triples)
+    print("{} triples\n".format(len(g)))
+    print("{:<8} {:>12} {:>10} {:>10} {:>10}".format("format", "size", "write", "read", "iterate"))
+
+    for format in args.formats:
+        start = time.perf_counter()
+        data = write(g, format)
+        write_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        count = read(data, format)
+        read_time = time.perf_counter() - start
+
+        # Iterating the triples without building a graph is possible only with the binary format
+        iterate = "-"
+        if format == "binary":
+            start = time.perf_counter()
+            for _ in Unpacker(io.BytesIO(data)):
+                pass
+            iterate = "{:9.2f}s".format(time.perf_counter() - start)
+
+        assert count == len(g), "{}: read {} triples of {}".format(format, count, len(g))
+
+        print("{:<8} {:>10.1f}MB {:>9.2f}s {:>9.2f}s {:>10}".format(
+            format, len(data) / 1024 / 1024, write_time, read_time, iterate
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Startup benchmark: measure the import time of magician with "python -X importtime" and check that
+the heavy dependencies are not imported at startup.
+
+Usage: python benchmarks/startup.py [--runs N]
+
+Exit with status 1 if a heavy dependency is imported by "import magician" or "import magician.cli".
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+# Dependencies that must be imported only when a schema needs them
+HEAVY_MODULES = [
+    "polars",
+    "numpy",
+    "rdflib",
+    "requests",
+    "jsonmerge",
+    "slugify",
+    "alive_progress",
+    "yaml",
+]
+
+
+def import_times(module: str) -> dict[str, int]:
+    """
+    Import a module in a fresh interpreter, returning the cumulative import time of each module, in µs.
+    """
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + module],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    times = {}
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+
+    return times
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="number of runs for each module (default: 5)")
+    args = parser.parse_args()
+
+    failed = False
+    for module in ["magician", "magician.cli"]:
+        runs = [import_times(module) for _ in range(args.runs)]
+
+        heavy = sorted({
+            name for times in runs for name in times if name.split(".")[0] in HEAVY_MODULES
+        })
+
+        print("import {:<14} median {:8.1f} ms   min {:8.1f} ms".format(
+            module,
+            statistics.median(times.get(module, 0) for times in runs) / 1000,
+            min(times.get(module, 0) for times in runs) / 1000,
+        ))
+
+        if heavy:
+            failed = True
+            print("\theavy modules imported at startup: " + ", ".join(
+                name for name in heavy if "." not in name
+            ))
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
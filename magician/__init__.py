@@ -1,17 +1,14 @@
-from jsonmerge import merge
 from pathlib import Path
-from .helpers import loadSchema, Grapher, Urifier, Templater, ObjectParser, Sourcer
-from alive_progress import alive_bar
 
+# Dependencies are imported by parse_schema only when needed, to keep "import magician" fast
 
-def parse_schema(schema_file: str | Path):
-    schema_file = Path(schema_file)
 
-    # Load the schema
-    print("\n\n🔬 LOADING SCHEMA: " + schema_file.name)
+def __export_info(schema: dict, schema_parent: Path) -> tuple[dict, Path]:
+    """
+    Get the export information of a schema, merged with the default one, and the export filename.
+    """
 
-    schema_parent = schema_file.parent.absolute()
-    schema = loadSchema(schema_file)
+    from jsonmerge import merge
 
     # Export information
     export: dict = schema.get('export', {})
@@ -24,85 +21,398 @@ def parse_schema(schema_file: str | Path):
     }, export)
     export_path = schema_parent.joinpath(export.get("parent"))
     export_filename = export_path.joinpath(export.get('name'))
-    export_formats = export.get('formats')
 
-    # Initialize the templater
-    templater = Templater()
+    return export, export_filename
 
-    # Initialize the grapher
-    grapher = Grapher(
-        namespace=schema.get('namespace'),
-        bindings=schema.get('prefixes'),
-        filename=export_filename,
-        formats=export_formats,
-    )
 
-    # Create the graph
-    g = grapher.create()
+def __grapher(schema: dict, export: dict, filename: Path, **options):
+    """
+    Initialize the grapher of a schema, the options override the export information.
+    """
+
+    from .helpers import Grapher
+
+    return Grapher(**{
+        "namespace": schema.get('namespace'),
+        "bindings": schema.get('prefixes'),
+        "filename": filename,
+        "formats": export.get('formats'),
+        "shards": export.get('shards', 1),
+        "streaming": export.get('streaming', False),
+        "dedup_memory": export.get('dedup_memory', 256),
+        "dedup_prefilter": export.get('dedup_prefilter', 0),
+        "upload": export.get('upload'),
+        **options
+    })
+
+
+def __part_filename(export_filename: Path, shard_index: int, shard_count: int) -> Path:
+    """
+    Get the filename (without extension) of the partial output of a shard.
+    """
+
+    return Path("{}.part-{:04d}-of-{:04d}".format(export_filename, shard_index, shard_count))
+
 
-    # Initialize the urifier
-    urifier = Urifier(g.namespaces(), schema.get('namespace'))
+def __index_records(records: list, offset: int, source: dict, shard: tuple[int, int] | None) -> list:
+    """
+    Set the {{__index}} of the records (their index in the whole source) and, if the rows are
+    split by a key column (shard_key), keep only the ones of the shard.
+    """
 
-    # Predicator
-    predicator = ObjectParser(
-        g,
-        schema.get("predicates_map", {}),
-        templater,
-        urifier,
-        schema.get("object_templates")
-    )
+    from .helpers import Grapher
 
-    # Parse individuals
-    print("\n🦠 PARSING INDIVIDUALS")
+    for i, record in enumerate(records):
+        record["__index"] = offset + i
 
-    individuals: dict = schema.get('individuals', {})
-    for individual_uri, individual in individuals.items():
-        if isinstance(individual, dict):
-            individual["uri"] = individual.get("uri", individual_uri)
+    shard_key = source.get("shard_key")
+    if shard is None or not shard_key:
+        return records
 
-            print("\t🦠 Adding object: " + individual_uri)
-            predicator.add_object(individual)
+    shard_index, shard_count = shard
 
-    # Parse sources
-    sourcer = Sourcer(schema_parent)
+    return [
+        record for record in records
+        if Grapher.shard_of(str(record.get(shard_key)), shard_count) == shard_index
+    ]
 
-    print("\n\n📜 CREATING FROM SOURCES")
-    for source in schema.get("sources", []):
+
+def __read_sources(sourcer, sources: list, batch_size: int, shard: tuple[int, int] | None = None, checkpointer=None,
+                   failed: list | None = None, totals: dict | None = None):
+    """
+    Read the sources in batches of records, for the reader stage of the pipeline.
+
+    Each batch is the index of the source, its object schemas, the records, the index of the row
+    after the batch and if the source is over: when a source is over, a batch without records is added.
+    The sources and rows already committed by the checkpointer are skipped.
+    The sources that cannot be read are added to failed. If known, the number of rows to read from
+    a source is set in totals, by the index of the source, before its first batch.
+    """
+
+    import functools
+
+    for source_index, source in enumerate(sources):
         # If not map specified or source is not a dict, go on
         if not isinstance(source, dict) or not source.get("object"):
             continue
 
-        # Get the data from the sourcer, passing all except for the object map
+        if checkpointer is not None and checkpointer.source_done(source_index):
+            print("\n📜 Skipping source already done: " + source.get("source"))
+            continue
+
         print("\n📜 Loading data from source: " + source.get("source"))
-        source_objects = None
-        try:
-            source_objects = sourcer.get_data(
-                {k: source[k] for k in source if not k == "object"}
-            )
-        except:
-            pass
 
         object_schemas = source.get("object")
         if isinstance(object_schemas, dict):
             object_schemas = [object_schemas]
 
-        # Create the objects passing the map and the data
-        if source_objects is not None and isinstance(source_objects, list):
-            total_objects = len(source_objects) * len(object_schemas)
-            with alive_bar(total_objects, title="⚗️ Adding objects") as bar:
-                for object_schema in object_schemas:
-                    for i, source_object in enumerate(source_objects):
-                        source_object["__index"] = i
+        # Without a key column, the rows of the shard are a contiguous range
+        rows = shard if shard is not None and not source.get("shard_key") else None
 
-                        predicator.add_object(
-                            object_schema, source_object
-                        )
+        # Continue from the last committed row
+        start = checkpointer.source_rows(source_index) if checkpointer is not None else 0
+        end = start
 
-                        # Update progress bar
-                        bar()
-        else:
+        # The rows split by a key column are known only when read
+        on_total = None
+        if totals is not None and (shard is None or not source.get("shard_key")):
+            on_total = functools.partial(totals.__setitem__, source_index)
+
+        try:
+            for offset, records in sourcer.iter_data(
+                {k: source[k] for k in source if not k == "object"}, batch_size, rows, start, on_total
+            ):
+                end = offset + len(records)
+                yield source_index, object_schemas, __index_records(records, offset, source, shard), end, False
+        except Exception:
             print(f"\t😱 Oh no! Cannot get data!")
 
-    # Save the graph
-    print("💾 Saving the RDF graph")
-    grapher.save(g)
+            if failed is not None:
+                failed.append(source.get("source"))
+
+            continue
+
+        yield source_index, object_schemas, [], end, True
+
+
+def parse_schema(schema_file: str | Path, pipeline: bool = False, batch_size: int = 1000,
+                 shard_index: int | None = None, shard_count: int | None = None,
+                 checkpoint: bool = False, resume: bool = False, checkpoint_interval: float = 60):
+    """
+    Build the graph of a schema and save it.
+
+    With pipeline, the sources are read, mapped and written in batches of batch_size records
+    by three concurrent stages (see Pipeliner), and the utilisation of each stage is reported.
+    The scanned sources (parquet, ipc, jsonl) are streamed, while CSV and Excel files, and sources
+    with a group_by, are read whole first. Unless the export is streaming with the nt or binary
+    formats only, the whole graph is kept in memory and serialized when the sources are over.
+
+    With shard_index and shard_count, only a shard of the schema is built, so a run can be split
+    between many machines sharing the filesystem:
+    - the rows of a source are split in contiguous ranges of {{__index}}, or by the hash of
+      a key column if the source has a shard_key
+    - the individuals are split by the hash of their key
+    The shard is saved as sorted N-Triples in <export name>.part-<index>-of-<count>.nt,
+    merge_shards() combines the parts in the final export. A ValueError is raised if shard_index is
+    given without a shard_count greater than 1, or is not between 0 and shard_count - 1.
+
+    With checkpoint, the triples are written to a partial output and the progress is saved at most
+    every checkpoint_interval seconds, at the end of a batch (see Checkpointer). With resume, a crashed
+    or stopped build continues from its last checkpoint, skipping the finished sources and rows.
+    The partial output and the state are removed when the graph is saved.
+
+    Return the sources that could not be read (the graph is built without them).
+    """
+
+    import sys
+    import json
+    import hashlib
+    import contextlib
+    from .helpers import loadSchema, Grapher, Urifier, Templater, ObjectParser, Sourcer
+    from .helpers.grapher import TripleWriter
+    from .helpers.pipeliner import Pipeliner, TripleCollector
+    from .helpers.checkpointer import Checkpointer
+
+    shard = None
+    if shard_index is not None and (shard_count is None or shard_count <= 1):
+        raise ValueError("A shard index needs a shard count greater than 1")
+
+    if shard_count is not None and shard_count > 1:
+        if shard_index is None or not 0 <= shard_index < shard_count:
+            raise ValueError("The shard index must be between 0 and {}".format(shard_count - 1))
+
+        shard = (shard_index, shard_count)
+
+    schema_file = Path(schema_file)
+
+    # Load the schema
+    print("\n\n🔬 LOADING SCHEMA: " + schema_file.name)
+
+    schema_parent = schema_file.parent.absolute()
+    schema = loadSchema(schema_file)
+
+    export, export_filename = __export_info(schema, schema_parent)
+
+    # Initialize the templater
+    templater = Templater()
+
+    # Initialize the grapher, a shard is saved as partial output
+    if shard is not None:
+        print("\n🧩 BUILDING SHARD {} OF {}".format(shard_index + 1, shard_count))
+
+        output_filename = __part_filename(export_filename, *shard)
+        grapher = __grapher(schema, export, output_filename, formats=["nt"], shards=1, upload=None)
+    else:
+        output_filename = export_filename
+        grapher = __grapher(schema, export, output_filename)
+
+    # Create the graph
+    g = grapher.create()
+
+    # Always remove the temporary files of the deduplication, also if the build fails
+    try:
+        # With checkpoints, the triples are written to the partial output of the checkpointer
+        checkpointer = None
+        if checkpoint or resume:
+            fingerprint = hashlib.sha256(
+                json.dumps([schema, shard], sort_keys=True, default=str).encode()
+            ).hexdigest()
+
+            checkpointer = Checkpointer(
+                output_filename, fingerprint, g.namespaces(), resume=resume, interval=checkpoint_interval
+            )
+
+            if checkpointer.resumed:
+                print("\n♻️ Resuming from the last checkpoint")
+
+        target = g if checkpointer is None else checkpointer
+
+        # Initialize the urifier
+        urifier = Urifier(g.namespaces(), schema.get('namespace'))
+
+        # Predicator
+        predicator = ObjectParser(
+            target,
+            schema.get("predicates_map", {}),
+            templater,
+            urifier,
+            schema.get("object_templates")
+        )
+
+        # Parse individuals
+        print("\n🦠 PARSING INDIVIDUALS")
+
+        individuals: dict = schema.get('individuals', {})
+        if checkpointer is not None and checkpointer.individuals_done():
+            print("\t🦠 Individuals already done")
+            individuals = {}
+
+        for individual_uri, individual in individuals.items():
+            if shard is not None and Grapher.shard_of(individual_uri, shard_count) != shard_index:
+                continue
+
+            if isinstance(individual, dict):
+                individual["uri"] = individual.get("uri", individual_uri)
+
+                print("\t🦠 Adding object: " + individual_uri)
+                predicator.add_object(individual)
+
+        if checkpointer is not None:
+            checkpointer.commit(individuals=True)
+
+        # Parse sources
+        sourcer = Sourcer(schema_parent)
+
+        print("\n\n📜 CREATING FROM SOURCES")
+        collector = TripleCollector()
+        source_predicator = ObjectParser(
+            collector,
+            schema.get("predicates_map", {}),
+            templater,
+            urifier,
+            schema.get("object_templates")
+        )
+
+        def map_batch(batch: tuple) -> tuple:
+            source_index, object_schemas, records, end, done = batch
+
+            for object_schema in object_schemas:
+                for record in records:
+                    source_predicator.add_object(object_schema, record)
+
+            return source_index, end, done, collector.take()
+
+        def write_batch(batch: tuple) -> None:
+            source_index, end, done, triples = batch
+
+            for triple in triples:
+                target.add(triple)
+
+            if checkpointer is not None:
+                checkpointer.commit(source_index, end, done)
+
+        failed_sources = []
+        totals = {}
+        batches = __read_sources(
+            sourcer, schema.get("sources", []), batch_size, shard, checkpointer, failed_sources, totals
+        )
+
+        if pipeline:
+            stats = Pipeliner().run(batches, map_batch, write_batch)
+
+            print("\n📊 Pipeline stages")
+            Pipeliner.report(stats)
+        else:
+            from alive_progress import alive_bar
+
+            # A progress bar for each source, with its total if known
+            with contextlib.ExitStack() as bars:
+                bar, bar_source = None, None
+                for batch in batches:
+                    source_index, object_schemas, records, _, done = batch
+
+                    if bar_source != source_index:
+                        bars.close()
+
+                        total = totals.get(source_index)
+                        # The current stdout, it's redirected when building in batch
+                        bar = bars.enter_context(alive_bar(
+                            total * len(object_schemas) if total is not None else None,
+                            title="⚗️ Adding objects",
+                            file=sys.stdout
+                        ))
+                        bar_source = source_index
+
+                    write_batch(map_batch(batch))
+
+                    # Update progress bar
+                    bar(len(records) * len(object_schemas))
+
+                    if done:
+                        bars.close()
+                        bar_source = None
+
+        # Load the partial output of the checkpointer
+        if checkpointer is not None:
+            checkpointer.close()
+
+            print("📥 Loading the partial output")
+            if isinstance(g, TripleWriter):
+                with open(checkpointer.partial_filename, encoding="utf-8", newline="\n") as fp:
+                    for line in fp:
+                        g.deduper.add(line)
+            else:
+                g.parse(checkpointer.partial_filename, format="nt")
+
+        # Save the graph
+        print("💾 Saving the RDF graph")
+        grapher.save(g)
+
+        if checkpointer is not None:
+            checkpointer.finish()
+    finally:
+        if isinstance(g, TripleWriter):
+            g.deduper.close()
+
+    return failed_sources
+
+
+def merge_shards(schema_file: str | Path, shard_count: int | None = None):
+    """
+    Merge the partial outputs of the shards of a schema (see parse_schema()) into the final export,
+    removing the duplicates. The export is done as configured in the schema (formats, shards, upload).
+
+    If shard_count is not given, it's read from the names of the parts. Raise a FileNotFoundError
+    if the part of some shard is missing.
+    """
+
+    import re
+    from .helpers import loadSchema
+
+    schema_file = Path(schema_file)
+
+    print("\n\n🧩 MERGING SHARDS OF SCHEMA: " + schema_file.name)
+
+    schema_parent = schema_file.parent.absolute()
+    schema = loadSchema(schema_file)
+
+    export, export_filename = __export_info(schema, schema_parent)
+
+    # Find the parts
+    if shard_count is None:
+        counts = set()
+        for part in export_filename.parent.glob(export_filename.name + ".part-*-of-*.nt"):
+            match = re.search(r"\.part-\d+-of-(\d+)\.nt$", part.name)
+            if match:
+                counts.add(int(match.group(1)))
+
+        if len(counts) != 1:
+            raise FileNotFoundError("Cannot find the parts of a single sharded run for " + str(export_filename))
+
+        shard_count = counts.pop()
+
+    parts = [
+        Path("{}.nt".format(__part_filename(export_filename, i, shard_count))) for i in range(shard_count)
+    ]
+
+    missing = [str(part) for part in parts if not part.exists()]
+    if missing:
+        raise FileNotFoundError("Missing parts: " + ", ".join(missing))
+
+    # The parts are already N-Triples: stream them to the deduplication
+    grapher = __grapher(schema, export, export_filename, streaming=True)
+    g = grapher.create()
+
+    try:
+        for part in parts:
+            print("\t🧩 Adding part: " + part.name)
+
+            with open(part, encoding="utf-8", newline="\n") as fp:
+                for line in fp:
+                    g.deduper.add(line)
+
+        # Save the graph
+        print("💾 Saving the RDF graph")
+        grapher.save(g)
+    finally:
+        g.deduper.close()
@@ -0,0 +1,183 @@
+import os
+import glob
+import time
+import contextlib
+import multiprocessing
+import traceback
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, Future, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from . import parse_schema
+
+
+def __expand_schema_files(schema_files: str | Path | list[str | Path]) -> list[Path]:
+    """
+    Expand a list of schema files and glob patterns, keeping the order and removing duplicates.
+    """
+
+    if isinstance(schema_files, (str, Path)):
+        schema_files = [schema_files]
+
+    paths = []
+    for schema_file in schema_files:
+        matches = glob.glob(str(schema_file), recursive=True)
+        for match in sorted(matches) if matches else [schema_file]:
+            path = Path(match).absolute()
+            if path not in paths:
+                paths.append(path)
+
+    return paths
+
+
+def __pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Create a pool of workers. They are spawned, not forked: a fork of a process that already used Polars
+    (eg. a build run before) can deadlock on the locks held by its threads.
+    """
+
+    return ProcessPoolExecutor(
+        max_workers=workers, initializer=__warm_up, mp_context=multiprocessing.get_context("spawn")
+    )
+
+
+def __warm_up() -> None:
+    """
+    Import the heavy dependencies once per worker, instead of once per schema.
+    """
+
+    import polars
+    import rdflib
+    import yaml
+
+
+def __run_schema(schema_file: Path, quiet: bool) -> dict:
+    """
+    Build a single schema, never raising: failures are reported in the result.
+    """
+
+    result = {"schema": str(schema_file), "ok": True, "seconds": 0.0, "error": None, "failed_sources": []}
+
+    start = time.perf_counter()
+    try:
+        if quiet:
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                result["failed_sources"] = parse_schema(schema_file) or []
+        else:
+            result["failed_sources"] = parse_schema(schema_file) or []
+    except BaseException as e:
+        if isinstance(e, KeyboardInterrupt):
+            raise
+
+        result["ok"] = False
+        result["error"] = traceback.format_exc()
+
+    result["seconds"] = time.perf_counter() - start
+
+    return result
+
+
+def __result(path: Path, future: Future) -> dict:
+    """
+    Get the result of a schema run by a worker, also if the worker died.
+    """
+
+    try:
+        result = future.result()
+    except Exception:
+        # The worker died (eg. killed by the OOM killer)
+        result = {
+            "schema": str(path), "ok": False, "seconds": 0.0, "error": traceback.format_exc(), "failed_sources": []
+        }
+
+    print("\t{} {:8.2f}s  {}".format(status(result), result["seconds"], result["schema"]))
+
+    return result
+
+
+def __run_pool(paths: list[Path], workers: int, quiet: bool, results: dict) -> list[Path]:
+    """
+    Build the schemas in a pool of workers, returning the ones not built because a worker died.
+    """
+
+    unfinished = []
+    with __pool(workers) as executor:
+        futures = {
+            executor.submit(__run_schema, path, quiet): path for path in paths
+        }
+
+        for future in as_completed(futures):
+            path = futures[future]
+
+            # A dying worker breaks the pool, failing every schema not finished yet
+            if isinstance(future.exception(), BrokenProcessPool):
+                unfinished.append(path)
+                continue
+
+            results[path] = __result(path, future)
+
+    return [path for path in paths if path in unfinished]
+
+
+def __run_isolated(paths: list[Path], workers: int, quiet: bool, results: dict) -> None:
+    """
+    Build each schema in a process of its own, so a dying worker fails only its schema.
+    """
+
+    for i in range(0, len(paths), workers):
+        executors = {path: __pool(1) for path in paths[i:i + workers]}
+        try:
+            futures = {path: executor.submit(__run_schema, path, quiet) for path, executor in executors.items()}
+
+            for path, future in futures.items():
+                results[path] = __result(path, future)
+        finally:
+            for executor in executors.values():
+                executor.shutdown()
+
+
+def status(result: dict) -> str:
+    """
+    Get the icon of the result of a schema: built, built without some sources or failed.
+    """
+
+    if not result["ok"]:
+        return "❌"
+
+    return "⚠️" if result.get("failed_sources") else "✅"
+
+
+def parse_schemas(schema_files: str | Path | list[str | Path], workers: int | None = None, quiet: bool = True) -> list[dict]:
+    """
+    Build many schemas across a pool of worker processes.
+
+    The schema files can be paths or glob patterns. Workers are reused for many schemas, so the
+    caches of the process (resolved base schemas, joined lookup tables, compiled templates) are warmed once.
+    A failing schema does not stop the others: if a worker dies, the schemas not finished yet are built
+    again, each in a process of its own.
+
+    Return a list of results, in the order of the schema files, with the keys:
+    - schema -> the schema file
+    - ok -> if the schema was built
+    - seconds -> the time spent on the schema
+    - error -> the traceback, if the schema failed
+    - failed_sources -> the sources that could not be read, if any
+    """
+
+    paths = __expand_schema_files(schema_files)
+
+    if workers is None:
+        workers = min(len(paths), os.cpu_count() or 1)
+
+    # Run in this process if there is no need of a pool
+    if workers <= 1 or len(paths) <= 1:
+        return [__run_schema(path, quiet) for path in paths]
+
+    results = {}
+    unfinished = __run_pool(paths, workers, quiet, results)
+
+    if unfinished:
+        print("\n💥 A worker died, building again {} schemas one per process".format(len(unfinished)))
+        __run_isolated(unfinished, workers, quiet, results)
+
+    return [results[path] for path in paths]
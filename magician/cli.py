@@ -0,0 +1,109 @@
+import sys
+import argparse
+
+
+def __build(args: argparse.Namespace) -> int:
+    from . import parse_schema
+
+    for schema_file in args.schemas:
+        parse_schema(
+            schema_file,
+            pipeline=args.pipeline,
+            batch_size=args.batch_size,
+            shard_index=args.shard_index,
+            shard_count=args.shard_count,
+            checkpoint=args.checkpoint,
+            resume=args.resume,
+            checkpoint_interval=args.checkpoint_interval
+        )
+
+    return 0
+
+
+def __merge(args: argparse.Namespace) -> int:
+    from . import merge_shards
+
+    for schema_file in args.schemas:
+        merge_shards(schema_file, shard_count=args.shard_count)
+
+    return 0
+
+
+def __batch(args: argparse.Namespace) -> int:
+    from .batch import parse_schemas, status
+
+    print("\n\n🧪 BUILDING SCHEMAS IN BATCH")
+    results = parse_schemas(args.schemas, workers=args.workers, quiet=not args.verbose)
+
+    # Report the timings
+    print("\n⏱️ TIMINGS")
+    for result in sorted(results, key=lambda result: result["seconds"], reverse=True):
+        print("\t{} {:8.2f}s  {}".format(status(result), result["seconds"], result["schema"]))
+
+    incomplete = [result for result in results if result["ok"] and result["failed_sources"]]
+    for result in incomplete:
+        print("\n⚠️ Sources not read in {}: {}".format(
+            result["schema"], ", ".join(result["failed_sources"])
+        ), file=sys.stderr)
+
+    failed = [result for result in results if not result["ok"]]
+    for result in failed:
+        print("\n😱 Failed: " + result["schema"], file=sys.stderr)
+        print(result["error"], file=sys.stderr)
+
+    print("\n{} built, {} without some sources, {} failed, {:.2f}s in total".format(
+        len(results) - len(failed) - len(incomplete), len(incomplete), len(failed),
+        sum(result["seconds"] for result in results)
+    ))
+
+    return 1 if failed else 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="magician",
+        description="Create Linked Data from different sources."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="build one or more schemas, one after the other")
+    build.add_argument("schemas", nargs="+", help="schema files")
+    build.add_argument("-p", "--pipeline", action="store_true",
+                       help="overlap reading, mapping and writing of the sources")
+    build.add_argument("-b", "--batch-size", type=int, default=1000,
+                       help="records read, mapped and written at a time, also the granularity of "
+                            "the checkpoints (default: 1000)")
+    build.add_argument("--shard-index", type=int, default=None,
+                       help="build only this shard (from 0), saved as partial output; "
+                            "needs --shard-count")
+    build.add_argument("--shard-count", type=int, default=None,
+                       help="number of shards the run is split in, greater than 1 when --shard-index is given")
+    build.add_argument("-c", "--checkpoint", action="store_true",
+                       help="save the progress periodically, to resume the build if it stops")
+    build.add_argument("-r", "--resume", action="store_true",
+                       help="resume the build from the last checkpoint (implies --checkpoint)")
+    build.add_argument("--checkpoint-interval", type=float, default=60,
+                       help="minimum seconds between two checkpoints (default: 60)")
+    build.set_defaults(func=__build)
+
+    merge = commands.add_parser("merge", help="merge the partial outputs of the shards into the export")
+    merge.add_argument("schemas", nargs="+", help="schema files")
+    merge.add_argument("--shard-count", type=int, default=None,
+                       help="number of shards (default: read from the partial outputs)")
+    merge.set_defaults(func=__merge)
+
+    batch = commands.add_parser("batch", help="build many schemas in parallel")
+    batch.add_argument("schemas", nargs="+", help="schema files or glob patterns")
+    batch.add_argument("-w", "--workers", type=int, default=None,
+                       help="number of worker processes (default: number of CPUs)")
+    batch.add_argument("-v", "--verbose", action="store_true",
+                       help="show the output of every schema")
+    batch.set_defaults(func=__batch)
+
+    args = parser.parse_args(argv)
+
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
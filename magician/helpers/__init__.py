@@ -1,30 +1,156 @@
-import yaml
-from jsonmerge import merge
+import os
+import copy
+import json
+import hashlib
+import datetime
+import importlib
 from pathlib import Path
 
-from .templater import Templater
-from .grapher import Grapher
-from .urifier import Urifier
-from .object_parser import ObjectParser
-from .sourcer import Sourcer
+# The helpers are imported when first used, so their dependencies are loaded only if needed
+__helpers = {
+    "Templater": "templater",
+    "Grapher": "grapher",
+    "Urifier": "urifier",
+    "ObjectParser": "object_parser",
+    "Sourcer": "sourcer",
+}
 
 
-def loadSchema(path: str | Path) -> dict:
+def __getattr__(name: str):
+    if name in __helpers:
+        return getattr(importlib.import_module("." + __helpers[name], __name__), name)
+
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+# Directory of the on-disk cache of resolved schemas
+SCHEMA_CACHE_DIR = Path(os.environ.get(
+    "MAGICIAN_CACHE_DIR",
+    Path.home().joinpath(".cache", "magician")
+)).joinpath("schemas")
+
+# In-process cache of resolved schemas: path -> (chain, schema)
+__schemas_cache: dict = {}
+
+
+def __file_hash(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def __chain_is_valid(chain: list) -> bool:
+    """
+    Check that every file of an extends chain is unchanged: the mtime and size are checked first,
+    the content hash only if they differ. A missing extends file (without mtime) must still be missing.
     """
-    Load a schema yaml file, extending the imported files defined into the schema.
 
-    When patterns are joined, arrays are added, objects are overwritten.
+    for file, mtime, size, sha in chain:
+        if mtime is None:
+            if os.path.exists(file):
+                return False
+
+            continue
+
+        try:
+            stat = os.stat(file)
+            if stat.st_mtime_ns == mtime and stat.st_size == size:
+                continue
+
+            if __file_hash(Path(file)) != sha:
+                return False
+        except OSError:
+            return False
+
+    return True
+
+
+def __disk_cache_file(path: Path) -> Path:
+    return SCHEMA_CACHE_DIR.joinpath(hashlib.sha1(str(path).encode()).hexdigest() + ".json")
+
+
+def __json_default(value):
+    """
+    Encode the dates of a YAML schema, which JSON doesn't support.
     """
 
-    # Convert the path into an absolute path
-    path = Path(path).absolute() if path else None
+    if isinstance(value, datetime.datetime):
+        return {"__datetime__": value.isoformat()}
+
+    if isinstance(value, datetime.date):
+        return {"__date__": value.isoformat()}
+
+    raise TypeError("Cannot cache a {}".format(type(value).__name__))
+
+
+def __json_object(value: dict):
+    if len(value) == 1 and "__datetime__" in value:
+        return datetime.datetime.fromisoformat(value["__datetime__"])
+
+    if len(value) == 1 and "__date__" in value:
+        return datetime.date.fromisoformat(value["__date__"])
+
+    return value
+
+
+def __read_disk_cache(path: Path) -> tuple[list, dict] | None:
+    try:
+        # JSON, not pickle: the cache directory may be shared, and loading it must never run code
+        with __disk_cache_file(path).open(encoding="utf-8") as fp:
+            cached = json.load(fp, object_hook=__json_object)
+
+        chain = [tuple(file) for file in cached["chain"]]
+        if __chain_is_valid(chain):
+            return chain, cached["schema"]
+    except:
+        pass
+
+    return None
 
-    # If the file not exists, return None
-    if path is None or not path.exists():
-        return None
+
+def __write_disk_cache(path: Path, chain: list, schema: dict) -> None:
+    try:
+        content = json.dumps({"chain": chain, "schema": schema}, default=__json_default)
+
+        # Schemas that JSON cannot keep as they are (eg. with non-string keys) are not cached on disk
+        if json.loads(content, object_hook=__json_object)["schema"] != schema:
+            return
+
+        cache_file = __disk_cache_file(path)
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write to a temporary file and replace, so concurrent runs never read a partial cache
+        tmp_file = cache_file.with_suffix(".{}.tmp".format(os.getpid()))
+        with tmp_file.open("w", encoding="utf-8") as fp:
+            fp.write(content)
+
+        os.replace(tmp_file, cache_file)
+    except:
+        pass
+
+
+def __resolve_schema(path: Path, cache: bool) -> tuple[list, dict] | None:
+    """
+    Load and extend a schema, returning the chain of the loaded files (path, mtime, size, hash) and the schema.
+    """
+
+    # Look for the resolved schema in the process, then on disk
+    if cache:
+        cached = __schemas_cache.get(path)
+        if cached is not None and __chain_is_valid(cached[0]):
+            return cached
+
+        cached = __read_disk_cache(path)
+        if cached is not None:
+            __schemas_cache[path] = cached
+            return cached
 
     # Load the schema
-    schema: dict = yaml.full_load(path.open())
+    content = path.read_bytes()
+    stat = path.stat()
+    chain = [(str(path), stat.st_mtime_ns, stat.st_size, hashlib.sha256(content).hexdigest())]
+
+    import yaml
+
+    # Use the libyaml bindings when they are available, they are much faster than the pure-Python loader
+    schema: dict = yaml.load(content, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
 
     # Check if the schema needs to be extended
     if schema.get('extends'):
@@ -35,11 +161,49 @@ def loadSchema(path: str | Path) -> dict:
         if not extends_path.is_absolute():
             extends_path = path.parent.joinpath(extends_path)
 
+        from jsonmerge import merge
+
         # Recursively load the schema and merge it with the first one
-        extends_schema = loadSchema(extends_path)
+        extends_path = extends_path.absolute()
+        extends = __resolve_schema(extends_path, cache) if extends_path.exists() else None
+        # A missing file is in the chain too, so the cache is invalidated when it's created
+        extends_chain, extends_schema = extends if extends is not None else (
+            [(str(extends_path), None, None, None)], None
+        )
+
         schema: dict = merge(extends_schema, schema)
+        chain += extends_chain
 
         # Remove the extend property
         del schema['extends']
 
-    return schema
+    if cache:
+        __schemas_cache[path] = (chain, schema)
+        __write_disk_cache(path, chain, schema)
+
+    return chain, schema
+
+
+def loadSchema(path: str | Path, cache: bool = True) -> dict:
+    """
+    Load a schema yaml file, extending the imported files defined into the schema.
+
+    When patterns are joined, arrays are added, objects are overwritten.
+
+    Resolved schemas are cached in the process and on disk (in MAGICIAN_CACHE_DIR, ~/.cache/magician by default),
+    keyed by the mtimes and hashes of the whole extends chain, so shared base schemas are resolved once.
+
+    Schemas are loaded with the safe loader: Python-specific tags (eg. !!python/tuple) are not supported.
+    """
+
+    # Convert the path into an absolute path
+    path = Path(path).absolute() if path else None
+
+    # If the file not exists, return None
+    if path is None or not path.exists():
+        return None
+
+    _, schema = __resolve_schema(path, cache)
+
+    # Callers modify the schema, never hand out the cached one
+    return copy.deepcopy(schema) if cache else schema
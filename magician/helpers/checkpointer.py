@@ -0,0 +1,147 @@
+from pathlib import Path
+import json
+import time
+import os
+
+from .ntriples import nt_row
+
+
+class Checkpointer:
+    """
+    This class replaces the graph in a checkpointed build: the triples are appended as N-Triples to a partial
+    output file and, periodically, the progress (the finished sources and the rows committed for the current one)
+    is saved in a small state file, together with the size of the partial output at that point.
+
+    When resuming, the partial output is truncated to the last committed size, so the triples of the rows
+    not committed are discarded and generated again: each row is in the output exactly once, and values like
+    {% uuid %} stay consistent with the rest of the output.
+    """
+
+    __filename: str = None
+    __fingerprint: str = None
+    __interval = 60.0
+
+    def __init__(self, filename: str | Path, fingerprint: str, namespaces, resume: bool = False, interval: float = 60) -> None:
+        """
+        - filename -> the filename (without extension) of the partial output and of the state file
+        - fingerprint -> identifies the run (eg. an hash of the schema), a state of a different run is not resumed
+        - namespaces -> the namespaces of the graph
+        - resume -> continue from the last checkpoint, if any
+        - interval -> the minimum seconds between two checkpoints
+        """
+
+        self.__filename = str(filename)
+        self.__fingerprint = fingerprint
+        self.__namespaces = list(namespaces)
+        self.__interval = interval
+        self.__last_commit = time.monotonic()
+
+        self.__state = {
+            "fingerprint": fingerprint,
+            "individuals": False,
+            "sources": {},
+            "bytes": 0,
+        }
+
+        Path(self.__filename).parent.mkdir(parents=True, exist_ok=True)
+
+        state = self.__load_state() if resume else None
+        if state is not None and state.get("fingerprint") == fingerprint and os.path.exists(self.partial_filename):
+            self.__state = state
+
+            # Discard the triples written after the last checkpoint
+            self.__fp = open(self.partial_filename, "r+b")
+            self.__fp.truncate(state["bytes"])
+            self.__fp.seek(state["bytes"])
+        else:
+            self.__fp = open(self.partial_filename, "wb")
+
+    @property
+    def partial_filename(self) -> str:
+        return self.__filename + ".partial.nt"
+
+    @property
+    def state_filename(self) -> str:
+        return self.__filename + ".checkpoint.json"
+
+    @property
+    def resumed(self) -> bool:
+        return self.__state["bytes"] > 0 or self.__state["individuals"]
+
+    def __load_state(self) -> dict | None:
+        try:
+            with open(self.state_filename, encoding="utf-8") as fp:
+                return json.load(fp)
+        except (OSError, ValueError):
+            return None
+
+    def add(self, triple: tuple) -> None:
+        self.__fp.write(nt_row(triple).encode("utf-8"))
+
+    def namespaces(self):
+        return iter(self.__namespaces)
+
+    def individuals_done(self) -> bool:
+        return self.__state["individuals"]
+
+    def source_done(self, source: int) -> bool:
+        return self.__state["sources"].get(str(source), {}).get("done", False)
+
+    def source_rows(self, source: int) -> int:
+        """
+        Get the rows of a source already committed: the index of the row to continue from.
+        """
+
+        return self.__state["sources"].get(str(source), {}).get("rows", 0)
+
+    def commit(self, source: int | None = None, rows: int = 0, done: bool = False, individuals: bool = False,
+               force: bool = False) -> None:
+        """
+        Record the progress and, if the interval is elapsed (or when a source or the individuals are done),
+        make it durable: flush the partial output and save the state.
+        """
+
+        if individuals:
+            self.__state["individuals"] = True
+
+        if source is not None:
+            self.__state["sources"][str(source)] = {"rows": rows, "done": done}
+
+        if not (force or done or individuals) and time.monotonic() - self.__last_commit < self.__interval:
+            return
+
+        # The output must be on disk before the state pointing to it
+        self.__fp.flush()
+        os.fsync(self.__fp.fileno())
+        self.__state["bytes"] = self.__fp.tell()
+
+        tmp_filename = self.state_filename + ".tmp"
+        with open(tmp_filename, "w", encoding="utf-8") as fp:
+            json.dump(self.__state, fp)
+            fp.flush()
+            os.fsync(fp.fileno())
+
+        os.replace(tmp_filename, self.state_filename)
+        self.__last_commit = time.monotonic()
+
+    def close(self) -> None:
+        """
+        Commit and close the partial output.
+        """
+
+        if not self.__fp.closed:
+            self.commit(force=True)
+            self.__fp.close()
+
+    def finish(self) -> None:
+        """
+        Remove the partial output and the state, when the build is saved.
+        """
+
+        self.close()
+
+        for filename in [self.partial_filename, self.state_filename]:
+            try:
+                os.remove(filename)
+            except OSError:
+                pass
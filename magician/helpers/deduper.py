@@ -0,0 +1,128 @@
+from pathlib import Path
+from typing import Iterator
+import tempfile
+import heapq
+import os
+
+
+class Deduper:
+    """
+    This class removes the duplicates from a stream of N-Triples lines, also when they don't fit in memory.
+
+    Lines are buffered up to a memory budget, then sorted and spilled to a temporary chunk file. Iterating
+    merges the sorted chunks, so the output is sorted (and canonical, to diff successive exports) and unique.
+    An optional exact prefilter (a bounded set of recently seen lines) drops the most common duplicates
+    before they reach the buffer.
+    """
+
+    # Approximate memory used by a buffered line, over its length
+    __line_overhead = 64
+
+    __memory = 0
+    __prefilter_size = 0
+    __tmp_dir = None
+
+    def __init__(self, memory: int = 256, prefilter: int = 0, tmp_dir: str | Path | None = None) -> None:
+        """
+        - memory -> the memory budget of the buffer, in MB
+        - prefilter -> the maximum number of lines kept in the prefilter (0 to disable it)
+        - tmp_dir -> the directory of the chunk files (default: the system one)
+        """
+
+        self.__memory = max(int(memory), 1) * 1024 * 1024
+        self.__prefilter_size = max(int(prefilter or 0), 0)
+        self.__tmp_dir = tmp_dir
+
+        self.__buffer: list[str] = []
+        self.__buffer_size = 0
+        self.__prefilter: set[str] = set()
+        self.__chunks: list[str] = []
+
+    def add(self, line: str) -> None:
+        """
+        Add a N-Triples line, terminated by a new line.
+        """
+
+        # Drop the duplicates already seen recently
+        if self.__prefilter_size:
+            if line in self.__prefilter:
+                return
+
+            if len(self.__prefilter) >= self.__prefilter_size:
+                self.__prefilter.clear()
+
+            self.__prefilter.add(line)
+
+        self.__buffer.append(line)
+        self.__buffer_size += len(line) + self.__line_overhead
+
+        if self.__buffer_size >= self.__memory:
+            self.__spill()
+
+    def __sorted_buffer(self) -> list[str]:
+        return sorted(set(self.__buffer))
+
+    def __spill(self) -> None:
+        """
+        Sort the buffer and write it into a chunk file.
+        """
+
+        fd, chunk = tempfile.mkstemp(prefix="magician-", suffix=".nt", dir=self.__tmp_dir)
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as fp:
+            fp.writelines(self.__sorted_buffer())
+
+        self.__chunks.append(chunk)
+        self.__buffer = []
+        self.__buffer_size = 0
+
+    def __iter__(self) -> Iterator[str]:
+        """
+        Iterate over the sorted and unique lines.
+        """
+
+        files = [open(chunk, encoding="utf-8", newline="\n") for chunk in self.__chunks]
+
+        try:
+            last = None
+            for line in heapq.merge(self.__sorted_buffer(), *files):
+                if line != last:
+                    yield line
+                    last = line
+        finally:
+            for fp in files:
+                fp.close()
+
+    def write(self, filename: str | Path) -> int:
+        """
+        Write the sorted and unique lines into a file, returning the number of lines.
+        """
+
+        count = 0
+        with open(filename, "w", encoding="utf-8", newline="") as fp:
+            for line in self:
+                fp.write(line)
+                count += 1
+
+        return count
+
+    def close(self) -> None:
+        """
+        Remove the chunk files and empty the buffer.
+        """
+
+        for chunk in self.__chunks:
+            try:
+                os.remove(chunk)
+            except OSError:
+                pass
+
+        self.__chunks = []
+        self.__buffer = []
+        self.__buffer_size = 0
+        self.__prefilter.clear()
+
+    def __enter__(self) -> "Deduper":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
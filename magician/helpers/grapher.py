@@ -1,7 +1,119 @@
 from rdflib import Graph
 from rdflib.namespace import DCTERMS
-from typing import Dict
+from typing import Dict, Tuple, Iterator
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import tempfile
+import hashlib
+import json
+import os
+
+from .deduper import Deduper
+from .packer import Packer
+from .ntriples import nt_row
+
+# The N-Triples formats, written line by line in sorted and canonical form
+NT_FORMATS = ["nt", "nt11", "ntriples"]
+
+# The compact binary format (see Packer)
+BINARY_FORMATS = ["binary", "mrdf"]
+
+
+def _file_info(filename: str) -> Tuple[int, str]:
+    """
+    Get the size and the sha256 of a file, reading it in blocks.
+    """
+
+    sha = hashlib.sha256()
+    size = 0
+    with open(filename, "rb") as fp:
+        for block in iter(lambda: fp.read(1024 * 1024), b""):
+            sha.update(block)
+            size += len(block)
+
+    return size, sha.hexdigest()
+
+
+def _serialize_shard(filename: str, source: str, formats: list[Tuple[str, str]], namespaces: list[Tuple[str, str]],
+                     dedup_memory: int = 256) -> list[dict]:
+    """
+    Serialize a shard, given as a file of N-Triples lines, in different formats. It runs in a worker process.
+    """
+
+    # Parse the graph only if needed by some format
+    g = None
+    if any(format not in NT_FORMATS for format, _ in formats):
+        g = Graph(bind_namespaces="rdflib")
+        for prefix, namespace in namespaces:
+            g.bind(prefix, namespace)
+
+        g.parse(source, format="nt")
+
+    files = []
+    for format, extension in formats:
+        shard_filename = "{}.{}".format(filename, extension)
+
+        if format in NT_FORMATS:
+            with Deduper(memory=dedup_memory) as deduper:
+                with open(source, encoding="utf-8", newline="\n") as fp:
+                    for line in fp:
+                        deduper.add(line)
+
+                triples = deduper.write(shard_filename)
+        elif format in BINARY_FORMATS:
+            with open(shard_filename, "wb") as fp, Packer(fp) as packer:
+                for triple in g:
+                    packer.add(triple)
+
+            triples = len(g)
+        else:
+            g.serialize(destination=shard_filename, format=format, encoding="utf-8")
+            triples = len(g)
+
+        size, sha = _file_info(shard_filename)
+
+        files.append({
+            "file": Path(shard_filename).name,
+            "format": format,
+            "triples": triples,
+            "bytes": size,
+            "sha256": sha,
+        })
+
+    return files
+
+
+class TripleWriter:
+    """
+    This class replaces the graph when exporting in streaming mode: the triples are not kept in an rdflib Graph,
+    but written as N-Triples to a Deduper, that spills them to disk and removes the duplicates.
+    """
+
+    __g: Graph = None
+    __deduper: Deduper = None
+
+    def __init__(self, g: Graph, deduper: Deduper) -> None:
+        self.__g = g
+        self.__deduper = deduper
+
+    def add(self, triple: tuple) -> None:
+        self.__deduper.add(nt_row(triple))
+
+    def namespaces(self):
+        return self.__g.namespaces()
+
+    @property
+    def graph(self) -> Graph:
+        """
+        The empty graph holding the bindings.
+        """
+
+        return self.__g
+
+    @property
+    def deduper(self) -> Deduper:
+        return self.__deduper
 
 
 class Grapher:
@@ -13,12 +125,33 @@ class Grapher:
     __bindings = None
     __filename = None
     __formats = None
+    __shards = 1
+    __streaming = False
+    __dedup_memory = 256
+    __dedup_prefilter = 0
+    __upload = None
+
+    # Map the extension from the format
+    __extensions = {
+        "turtle": "ttl",
+        "xml": "rdf",
+        "nt": "nt",
+        "nt11": "nt",
+        "ntriples": "nt",
+        "binary": "mrdf",
+        "mrdf": "mrdf",
+    }
 
     def __init__(self,
                  namespace: str,
                  bindings: Dict[str, str],
                  filename: str | Path = "export",
-                 formats: list[str] = ["xml"]
+                 formats: list[str] = ["xml"],
+                 shards: int = 1,
+                 streaming: bool = False,
+                 dedup_memory: int = 256,
+                 dedup_prefilter: int = 0,
+                 upload: dict | None = None
                  ):
         self.__bindings = bindings
 
@@ -32,10 +165,22 @@ class Grapher:
         # Set export info
         self.__filename = filename
         self.__formats = formats
+        self.__shards = max(int(shards or 1), 1)
+
+        # Set streaming and deduplication info
+        self.__streaming = bool(streaming)
+        self.__dedup_memory = dedup_memory or 256
+        self.__dedup_prefilter = dedup_prefilter or 0
 
-    def create(self) -> Graph:
+        # Set the Graph Store endpoint info (see Uploader for the options)
+        self.__upload = upload
+
+    def create(self) -> Graph | TripleWriter:
         """
         Initialize a graph with all default and required bindings.
+
+        In streaming mode, a TripleWriter is returned instead: the triples are written to disk
+        and deduplicated when saving, so the graph is never fully kept in memory.
         """
 
         # Initialize graph
@@ -50,18 +195,28 @@ class Grapher:
             for binding, namespace in self.__bindings.items():
                 g.bind(binding, namespace)
 
+        if self.__streaming:
+            return TripleWriter(g, self.deduper())
+
         return g
 
-    def save(self, g: Graph) -> None:
+    def deduper(self) -> Deduper:
         """
-        Serialize the graph and save it in different formats
+        Initialize a Deduper with the memory budget of the export.
         """
 
-        # Map the extension from the format
-        extensions = {
-            "turtle": "ttl",
-            "xml": "rdf",
-        }
+        return Deduper(memory=self.__dedup_memory, prefilter=self.__dedup_prefilter)
+
+    def save(self, g: Graph | TripleWriter) -> None:
+        """
+        Serialize the graph and save it in different formats
+
+        N-Triples are written sorted and without duplicates, so successive exports can be diffed.
+        In streaming mode, only the N-Triples and binary formats are written without keeping the triples
+        in memory: the other formats (like the default xml) are serialized loading all the deduplicated
+        triples in a graph.
+        If an upload endpoint is set, the triples are also pushed to it (see Uploader).
+        """
 
         # Create folder if not exists
         Path(self.__filename).parent.mkdir(
@@ -69,8 +224,195 @@ class Grapher:
             exist_ok=True
         )
 
+        try:
+            if self.__shards > 1:
+                self.__save_shards(g)
+            else:
+                self.__save_files(g)
+
+            if self.__upload:
+                self.__upload_triples(g)
+        finally:
+            if isinstance(g, TripleWriter):
+                g.deduper.close()
+
+    def __upload_triples(self, g: Graph | TripleWriter) -> None:
+        """
+        Push the triples to the Graph Store endpoint.
+        """
+
+        from .uploader import Uploader
+
+        uploader = Uploader(
+            **self.__upload,
+            namespaces=[(prefix, str(namespace)) for prefix, namespace in g.namespaces()]
+        )
+
+        stats = uploader.upload(self.__lines(g))
+
+        print("\t📤 Uploaded {} triples in {} batches in {:.2f}s".format(
+            stats["triples"], stats["batches"], stats["seconds"]
+        ))
+
+    def __save_files(self, g: Graph | TripleWriter) -> None:
+        """
+        Save the graph in a file for each format.
+        """
+
+        graph = g if isinstance(g, Graph) else None
         for format in self.__formats:
-            extension = extensions.get(format, "xml")
+            extension = self.__extensions.get(format, "xml")
+            filename = "{}.{}".format(self.__filename, extension)
+
+            if format in NT_FORMATS:
+                self.__save_nt(g, filename)
+                continue
+
+            if format in BINARY_FORMATS:
+                self.__save_binary(g, filename)
+                continue
+
+            if graph is None:
+                graph = self.__load(g)
+
+            with open(filename, "w", encoding="utf-8") as fp:
+                fp.write(graph.serialize(format=format))
+
+    def __save_nt(self, g: Graph | TripleWriter, filename: str) -> int:
+        """
+        Write the sorted and unique triples as N-Triples.
+        """
+
+        if isinstance(g, TripleWriter):
+            return g.deduper.write(filename)
+
+        with self.deduper() as deduper:
+            for triple in g:
+                deduper.add(nt_row(triple))
+
+            return deduper.write(filename)
+
+    def __save_binary(self, g: Graph | TripleWriter, filename: str) -> None:
+        """
+        Write the triples in the binary format. In streaming mode, the deduplicated triples are
+        read from disk in chunks, without loading them all in a graph.
+        """
+
+        with open(filename, "wb") as fp, Packer(fp) as packer:
+            if isinstance(g, Graph):
+                for triple in g:
+                    packer.add(triple)
+
+                return
+
+            for triple in self.__triples(g):
+                packer.add(triple)
+
+    def __triples(self, g: TripleWriter, chunk_size: int = 100000) -> Iterator[tuple]:
+        """
+        Iterate over the deduplicated triples of a TripleWriter, parsing them in chunks of lines.
+        """
+
+        # Blank nodes are shared between the chunks
+        bnode_context = {}
+
+        chunk = []
+        for line in g.deduper:
+            chunk.append(line)
+
+            if len(chunk) >= chunk_size:
+                yield from Graph().parse(data="".join(chunk), format="nt", bnode_context=bnode_context)
+                chunk = []
+
+        yield from Graph().parse(data="".join(chunk), format="nt", bnode_context=bnode_context)
+
+    def __load(self, g: TripleWriter) -> Graph:
+        """
+        Load the deduplicated triples of a TripleWriter in a graph.
+        """
+
+        print("\t⚠️ Loading all the triples in memory: only the nt and binary formats are saved without it")
+
+        graph = g.graph
+        for triple in self.__triples(g):
+            graph.add(triple)
+
+        return graph
+
+    def __lines(self, g: Graph | TripleWriter) -> Iterator[str]:
+        """
+        Iterate over the triples as N-Triples lines.
+        """
+
+        if isinstance(g, TripleWriter):
+            return iter(g.deduper)
+
+        return (nt_row(triple) for triple in g)
+
+    def __save_shards(self, g: Graph) -> None:
+        """
+        Partition the triples by subject in shards, serialize them in parallel and write a manifest
+        listing the shards files, their triple counts and checksums.
+        """
+
+        formats = [(format, self.__extensions.get(format, "xml")) for format in self.__formats]
+        namespaces = [(prefix, str(namespace)) for prefix, namespace in g.namespaces()]
+
+        with tempfile.TemporaryDirectory(prefix="magician-shards-") as tmp_dir:
+            # Partition the triples hashing the subject, so all the triples of a subject are in the same shard.
+            # The shards are written to temporary files, the workers read them.
+            sources = [os.path.join(tmp_dir, "{}.nt".format(i)) for i in range(self.__shards)]
+
+            fps = [open(source, "w", encoding="utf-8", newline="\n") for source in sources]
+            try:
+                for line in self.__lines(g):
+                    fps[self.shard_of(line[:line.index(" ")], self.__shards)].write(line)
+            finally:
+                for fp in fps:
+                    fp.close()
+
+            # The workers are spawned: a fork of a process that used Polars can deadlock
+            with ProcessPoolExecutor(
+                max_workers=min(self.__shards, os.cpu_count() or 1), mp_context=multiprocessing.get_context("spawn")
+            ) as executor:
+                results = executor.map(
+                    _serialize_shard,
+                    [self.shard_filename(i) for i in range(self.__shards)],
+                    sources,
+                    [formats] * self.__shards,
+                    [namespaces] * self.__shards,
+                    [self.__dedup_memory] * self.__shards
+                )
+
+                files = []
+                triples = 0
+                for i, shard_files in enumerate(results):
+                    for shard_file in shard_files:
+                        files.append({"shard": i, **shard_file})
+
+                    # Every file of a shard has the same (unique) triples
+                    triples += shard_files[0]["triples"] if shard_files else 0
+
+        manifest = {
+            "shards": self.__shards,
+            "triples": triples,
+            "files": files,
+        }
+
+        with open("{}.manifest.json".format(self.__filename), "w", encoding="utf-8") as fp:
+            json.dump(manifest, fp, indent=2)
+
+    def shard_filename(self, shard: int) -> str:
+        """
+        Get the filename (without extension) of a shard.
+        """
+
+        return "{}.shard-{:04d}-of-{:04d}".format(self.__filename, shard, self.__shards)
+
+    @staticmethod
+    def shard_of(subject: str, shards: int) -> int:
+        """
+        Get the shard of a subject, given in N-Triples notation. It's stable between runs and machines.
+        """
 
-            with open("{}.{}".format(self.__filename, extension), "w", encoding="utf-8") as fp:
-                fp.write(g.serialize(format=format))
+        return int.from_bytes(hashlib.md5(subject.encode()).digest()[:8], "big") % shards
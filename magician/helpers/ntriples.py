@@ -0,0 +1,30 @@
+from rdflib import Literal
+
+
+def _quote_literal(literal: Literal) -> str:
+    value = '"{}"'.format(
+        literal.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"').replace("\r", "\\r")
+    )
+
+    if literal.language:
+        return "{}@{}".format(value, literal.language)
+
+    if literal.datatype:
+        return "{}^^<{}>".format(value, literal.datatype)
+
+    return value
+
+
+def nt_row(triple: tuple) -> str:
+    """
+    Write a triple as a N-Triples line, terminated by a new line.
+
+    Like the N-Triples serializer of rdflib, characters are escaped only where N-Triples requires it,
+    so other line separators (eg. U+0085) are written as they are.
+    """
+
+    s, p, o = triple
+    if isinstance(o, Literal):
+        return "{} {} {} .\n".format(s.n3(), p.n3(), _quote_literal(o))
+
+    return "{} {} {} .\n".format(s.n3(), p.n3(), o.n3())
@@ -0,0 +1,199 @@
+from rdflib import Graph, URIRef, BNode, Literal
+from typing import BinaryIO, Iterator, Tuple
+from array import array
+import struct
+import sys
+import zlib
+
+# File signature and version
+MAGIC = b"MGRDF\x01"
+
+# Term kinds
+IRI = 0
+BLANK = 1
+LITERAL = 2
+
+# Id of a literal without datatype
+NO_DATATYPE = 0xFFFFFFFF
+
+_frame_header = struct.Struct("<I")
+_counts = struct.Struct("<II")
+_term = struct.Struct("<BI")
+_literal = struct.Struct("<II")
+
+
+class Packer:
+    """
+    This class writes triples in a compact binary format, to be reloaded much faster than the text formats.
+
+    The file is a signature followed by zlib-compressed frames, so it can be written and read as a stream.
+    Each frame holds the terms first seen in the frame (the term dictionary grows frame by frame)
+    and a block of triples, as three 32-bit term ids each:
+
+    frame := compressed length (uint32) + zlib(terms count (uint32), triples count (uint32), terms, triples)
+    term := kind (uint8), value length (uint32), value (utf-8) [, datatype id (uint32), language length (uint32), language]
+    triples := subject, predicate and object ids (uint32) for each triple
+    """
+
+    __fp: BinaryIO = None
+    __frame_size = 100000
+    __level = 6
+
+    def __init__(self, fp: BinaryIO, frame_size: int = 100000, level: int = 6) -> None:
+        """
+        - fp -> the binary file to write
+        - frame_size -> the number of triples in a frame
+        - level -> the zlib compression level
+        """
+
+        self.__fp = fp
+        self.__frame_size = max(int(frame_size), 1)
+        self.__level = level
+
+        self.__ids: dict = {}
+        self.__terms: list[bytes] = []
+        self.__triples = array("I")
+        self.__count = 0
+
+        self.__fp.write(MAGIC)
+
+    def __id(self, term) -> int:
+        term_id = self.__ids.get(term)
+        if term_id is not None:
+            return term_id
+
+        if isinstance(term, Literal):
+            datatype = self.__id(term.datatype) if term.datatype is not None and not term.language else NO_DATATYPE
+            value = str(term).encode("utf-8")
+            language = (term.language or "").encode("utf-8")
+
+            self.__terms.append(
+                _term.pack(LITERAL, len(value)) + value + _literal.pack(datatype, len(language)) + language
+            )
+        else:
+            value = str(term).encode("utf-8")
+            self.__terms.append(_term.pack(BLANK if isinstance(term, BNode) else IRI, len(value)) + value)
+
+        term_id = len(self.__ids)
+        self.__ids[term] = term_id
+
+        return term_id
+
+    def add(self, triple: Tuple) -> None:
+        s, p, o = triple
+        self.__triples.extend((self.__id(s), self.__id(p), self.__id(o)))
+        self.__count += 1
+
+        if self.__count >= self.__frame_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Write the pending terms and triples as a frame.
+        """
+
+        if not self.__count and not self.__terms:
+            return
+
+        triples = self.__triples
+        if sys.byteorder != "little":
+            triples = array("I", triples)
+            triples.byteswap()
+
+        payload = zlib.compress(
+            _counts.pack(len(self.__terms), self.__count) + b"".join(self.__terms) + triples.tobytes(),
+            self.__level
+        )
+
+        self.__fp.write(_frame_header.pack(len(payload)))
+        self.__fp.write(payload)
+
+        self.__terms = []
+        self.__triples = array("I")
+        self.__count = 0
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self) -> "Packer":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+class Unpacker:
+    """
+    This class reads the triples written by a Packer, frame by frame, without parsing any text.
+    """
+
+    __fp: BinaryIO = None
+
+    def __init__(self, fp: BinaryIO) -> None:
+        self.__fp = fp
+
+        if self.__fp.read(len(MAGIC)) != MAGIC:
+            raise ValueError("Not a magician binary RDF file")
+
+    def __read_terms(self, payload: memoryview, count: int, terms: list) -> int:
+        offset = _counts.size
+        for _ in range(count):
+            kind, length = _term.unpack_from(payload, offset)
+            offset += _term.size
+
+            value = str(payload[offset:offset + length], "utf-8")
+            offset += length
+
+            if kind == LITERAL:
+                datatype, length = _literal.unpack_from(payload, offset)
+                offset += _literal.size
+
+                language = str(payload[offset:offset + length], "utf-8") or None
+                offset += length
+
+                terms.append(Literal(
+                    value,
+                    lang=language,
+                    datatype=terms[datatype] if datatype != NO_DATATYPE else None
+                ))
+            elif kind == BLANK:
+                terms.append(BNode(value))
+            else:
+                terms.append(URIRef(value))
+
+        return offset
+
+    def __iter__(self) -> Iterator[Tuple]:
+        terms: list = []
+
+        while True:
+            header = self.__fp.read(_frame_header.size)
+            if len(header) < _frame_header.size:
+                return
+
+            (length,) = _frame_header.unpack(header)
+            payload = memoryview(zlib.decompress(self.__fp.read(length)))
+
+            terms_count, triples_count = _counts.unpack_from(payload, 0)
+            offset = self.__read_terms(payload, terms_count, terms)
+
+            ids = array("I")
+            ids.frombytes(payload[offset:offset + triples_count * 12])
+            if sys.byteorder != "little":
+                ids.byteswap()
+
+            for i in range(0, len(ids), 3):
+                yield terms[ids[i]], terms[ids[i + 1]], terms[ids[i + 2]]
+
+    def to_graph(self, g: Graph | None = None) -> Graph:
+        """
+        Load the triples in a graph (a new one if not given).
+        """
+
+        if g is None:
+            g = Graph()
+
+        for triple in self:
+            g.add(triple)
+
+        return g
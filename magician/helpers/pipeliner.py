@@ -0,0 +1,163 @@
+from typing import Any, Callable, Iterable
+from queue import Queue, Empty, Full
+import threading
+import time
+
+
+class TripleCollector:
+    """
+    This class replaces the graph in the mapper stage of a pipeline: it collects the triples in a batch,
+    that is handed to the writer stage.
+    """
+
+    def __init__(self) -> None:
+        self.__triples: list[tuple] = []
+
+    def add(self, triple: tuple) -> None:
+        self.__triples.append(triple)
+
+    def take(self) -> list[tuple]:
+        """
+        Get the collected triples and start a new batch.
+        """
+
+        triples = self.__triples
+        self.__triples = []
+
+        return triples
+
+
+class Pipeliner:
+    """
+    This class runs a reader, a mapper and a writer stage, each on its own thread, connected by bounded queues.
+
+    The reader produces record batches, the mapper turns them into triple batches and the writer stores them,
+    so loading, mapping and writing overlap. A full queue blocks the stage before it (backpressure),
+    so at most queue_size batches wait between two stages. This bounds only the batches in flight: what the
+    writer stores (eg. an in-memory graph) still grows with the output. Polars and file I/O release the GIL, so they
+    overlap with the mapping; the mapping itself is pure Python and runs on a single core.
+    """
+
+    __queue_size = 4
+
+    # Marks the end of the batches
+    __done = object()
+
+    def __init__(self, queue_size: int = 4) -> None:
+        self.__queue_size = max(int(queue_size), 1)
+        self.__stop = threading.Event()
+        self.__errors: list[BaseException] = []
+        self.__stats: dict[str, dict] = {}
+
+    def __put(self, queue: Queue, item: Any) -> None:
+        while not self.__stop.is_set():
+            try:
+                queue.put(item, timeout=0.1)
+                return
+            except Full:
+                pass
+
+    def __get(self, queue: Queue) -> Any:
+        while not self.__stop.is_set():
+            try:
+                return queue.get(timeout=0.1)
+            except Empty:
+                pass
+
+        return self.__done
+
+    def __stage(self, name: str, inbox: Queue | None, outbox: Queue | None,
+                work: Callable[[Any], Any] | None, batches: Iterable | None = None) -> None:
+        """
+        Run a stage, timing the work (busy) and the time spent waiting on the queues.
+        """
+
+        stats = self.__stats[name]
+        iterator = iter(batches) if batches is not None else None
+
+        try:
+            while not self.__stop.is_set():
+                # Get the next batch
+                start = time.perf_counter()
+                if iterator is not None:
+                    batch = next(iterator, self.__done)
+                    stats["busy"] += time.perf_counter() - start
+                else:
+                    batch = self.__get(inbox)
+                    stats["waiting"] += time.perf_counter() - start
+
+                if batch is self.__done:
+                    break
+
+                # Do the work
+                if work is not None:
+                    start = time.perf_counter()
+                    batch = work(batch)
+                    stats["busy"] += time.perf_counter() - start
+
+                stats["batches"] += 1
+
+                # Hand the batch to the next stage
+                if outbox is not None:
+                    start = time.perf_counter()
+                    self.__put(outbox, batch)
+                    stats["waiting"] += time.perf_counter() - start
+        except BaseException as e:
+            self.__errors.append(e)
+            self.__stop.set()
+        finally:
+            if outbox is not None:
+                self.__put(outbox, self.__done)
+
+    def run(self, batches: Iterable, mapper: Callable[[Any], Any], writer: Callable[[Any], None]) -> dict[str, dict]:
+        """
+        Run the pipeline until the batches are over, raising the first error of any stage.
+
+        Return, for each stage, the number of batches, the seconds spent working (busy) and waiting,
+        and the utilisation (busy time over the pipeline time).
+        """
+
+        self.__stats = {
+            name: {"batches": 0, "busy": 0.0, "waiting": 0.0, "utilisation": 0.0}
+            for name in ["reader", "mapper", "writer"]
+        }
+
+        records: Queue = Queue(self.__queue_size)
+        triples: Queue = Queue(self.__queue_size)
+
+        threads = [
+            threading.Thread(target=self.__stage, args=("reader", None, records, None, batches), daemon=True),
+            threading.Thread(target=self.__stage, args=("mapper", records, triples, mapper), daemon=True),
+            threading.Thread(target=self.__stage, args=("writer", triples, None, writer), daemon=True),
+        ]
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        elapsed = time.perf_counter() - start
+
+        if self.__errors:
+            raise self.__errors[0]
+
+        for stats in self.__stats.values():
+            stats["utilisation"] = stats["busy"] / elapsed if elapsed > 0 else 0.0
+
+        return self.__stats
+
+    @staticmethod
+    def report(stats: dict[str, dict]) -> None:
+        """
+        Print the utilisation of the stages: the busiest one is the bottleneck.
+        """
+
+        bottleneck = max(stats, key=lambda name: stats[name]["busy"])
+
+        for name, stage in stats.items():
+            print("\t{} {:<7} {:>6} batches  {:8.2f}s busy  {:8.2f}s waiting  {:6.1%}".format(
+                "🐢" if name == bottleneck else "  ",
+                name, stage["batches"], stage["busy"], stage["waiting"], stage["utilisation"]
+            ))
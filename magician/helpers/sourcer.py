@@ -1,10 +1,15 @@
+from __future__ import annotations
 from pathlib import Path
-import polars as pl
-import requests
 import xml.etree.ElementTree as ET
-from typing import Dict
+from typing import Callable, Dict, Iterator, Tuple, TYPE_CHECKING
+from collections import OrderedDict
+import os
 import re
 
+# Polars is imported only when reading a DataFrame format
+if TYPE_CHECKING:
+    import polars as pl
+
 
 class Sourcer():
     """
@@ -12,7 +17,11 @@ class Sourcer():
     """
 
     __abs_path = None
-    __df_formats = ["csv", "excel"]
+    __df_formats = ["csv", "xls", "excel", "parquet", "ipc", "feather", "arrow", "jsonl", "ndjson"]
+
+    # Joined lookup tables, shared by every instance in the process (least recently used are dropped)
+    __joins_cache: OrderedDict[tuple, tuple] = OrderedDict()
+    __joins_cache_size = 16
 
     def __init__(self, abs_path: Path):
         self.__abs_path = abs_path
@@ -72,15 +81,103 @@ class Sourcer():
 
         return data
 
-    def __parse_df(self, source: str, format: str, schema: dict, as_df: bool = False) -> dict | pl.DataFrame | None:
+    def __get_join_data(self, join_info: dict) -> pl.DataFrame | None:
         """
-        Load a DataFrame
+        Load a DataFrame to join, reusing the one already loaded if the file is unchanged
+        """
+
+        # The files of the join and of the nested joins
+        files = self.__join_files(join_info)
+        if files is None:
+            return self.get_data(join_info, True)
+
+        try:
+            stats = tuple((str(path), os.stat(path).st_mtime_ns, os.stat(path).st_size) for path in files)
+        except OSError:
+            return None
+
+        key = (str(files[0]), repr(sorted((k, repr(v)) for k, v in join_info.items())))
+
+        cached = self.__joins_cache.get(key)
+        if cached is not None and cached[0] == stats:
+            self.__joins_cache.move_to_end(key)
+            return cached[1]
+
+        # Replace the stale entry, if any, and drop the least recently used ones
+        join_data = self.get_data(join_info, True)
+        self.__joins_cache[key] = (stats, join_data)
+        self.__joins_cache.move_to_end(key)
+
+        while len(self.__joins_cache) > self.__joins_cache_size:
+            self.__joins_cache.popitem(last=False)
+
+        return join_data
+
+    def __join_files(self, join_info: dict) -> list[Path] | None:
+        """
+        Get the files read by a join, including the nested joins, or None if some source is online.
         """
 
+        source: str = join_info.get("source")
+        if not source or source.startswith("http"):
+            return None
+
+        files = [self.__abs_path.joinpath(source)]
+
+        nested_joins = join_info.get("join")
+        if not isinstance(nested_joins, list):
+            nested_joins = [nested_joins]
+
+        for nested_join in nested_joins:
+            if nested_join and isinstance(nested_join, dict):
+                nested_files = self.__join_files(nested_join)
+                if nested_files is None:
+                    return None
+
+                files += nested_files
+
+        return files
+
+    def __scan_df(self, source: str, format: str, schema: dict) -> pl.LazyFrame:
+        """
+        Get a LazyFrame of the source. Columnar and line-delimited formats are scanned, so only the
+        projected columns (the "columns" property of the schema) are read.
+        """
+
+        import polars as pl
+        import polars.selectors as cs
+
         if format == "csv":
-            df = pl.read_csv(source, infer_schema_length=0)
-        elif format == "xls":
-            df = pl.read_excel(source)
+            lf = pl.read_csv(source, infer_schema_length=0).lazy()
+        elif format == "xls" or format == "excel":
+            lf = pl.read_excel(source).lazy()
+        elif format == "parquet":
+            lf = pl.scan_parquet(source)
+        elif format == "ipc" or format == "feather" or format == "arrow":
+            # IPC files are memory-mapped
+            lf = pl.scan_ipc(source)
+        elif format == "jsonl" or format == "ndjson":
+            lf = pl.scan_ndjson(source)
+
+        # Project the columns
+        columns = schema.get("columns")
+        if columns is not None:
+            if not isinstance(columns, list):
+                columns = [columns]
+
+            lf = lf.select(columns)
+
+        # Values are used as strings by the templater, like the ones read from a CSV
+        return lf.with_columns((cs.numeric() | cs.temporal() | cs.boolean()).cast(pl.Utf8))
+
+    def __lazy_df(self, source: str, format: str, schema: dict) -> pl.LazyFrame:
+        """
+        Get a LazyFrame of the source, with its joins and groups
+        """
+
+        import polars as pl
+
+        lf = self.__scan_df(source, format, schema)
 
         # Join with other dataframes
         joins_info = schema.get("join")
@@ -93,20 +190,28 @@ class Sourcer():
                 # Get the dataframe to join
                 join_data = None
                 try:
-                    join_data = self.get_data(join_info, True)
+                    join_data = self.__get_join_data(join_info)
                 except:
                     pass
 
                 if not join_data is None:
-                    try:
-                        df = df.join(
-                            join_data,
+                    # Errors of a lazy join are raised only when collecting, so check the columns before
+                    left_on = join_info.get("left_on")
+                    right_on = join_info.get("right_on")
+
+                    left_cols = left_on if isinstance(left_on, list) else [left_on]
+                    right_cols = right_on if isinstance(right_on, list) else [right_on]
+
+                    if set(left_cols) <= set(lf.collect_schema().names()) and set(right_cols) <= set(join_data.columns):
+                        lf = lf.join(
+                            join_data.lazy(),
                             how="left",
-                            left_on=join_info.get("left_on"),
-                            right_on=join_info.get("right_on")
+                            left_on=left_on,
+                            right_on=right_on,
+                            # Keep the order of the rows (and of the matches of a row), so {{__index}}
+                            # is the same in every run: shards and resumed builds slice the rows by it
+                            maintain_order="left_right"
                         )
-                    except:
-                        pass
 
         if schema.get("group_by") is not None and schema.get("group_agg") is not None:
             group_by = schema.get("group_by")
@@ -130,7 +235,17 @@ class Sourcer():
 
                 print(func)
 
-            df = df.groupby(group_by).agg(aggregations)
+            # The groups are in the order of their first row, the same in every run
+            lf = lf.group_by(group_by, maintain_order=True).agg(aggregations)
+
+        return lf
+
+    def __parse_df(self, source: str, format: str, schema: dict, as_df: bool = False) -> dict | pl.DataFrame | None:
+        """
+        Load a DataFrame
+        """
+
+        df = self.__lazy_df(source, format, schema).collect()
 
         print(df)
 
@@ -139,6 +254,8 @@ class Sourcer():
     def get_data(self, schema: dict, as_df: bool = False) -> list | pl.DataFrame | None:
         """
         Download the data and uniform it, using different sources types (json, text, csv, kml, online or offline data).
+
+        DataFrame formats: csv, xls (or excel), parquet, ipc (or feather, arrow), jsonl (or ndjson).
         """
 
         source: str = schema.get("source")
@@ -156,7 +273,7 @@ class Sourcer():
         # Initialize data
         data = None
 
-        # Format is a DataFrame format (csv, excel)
+        # Format is a DataFrame format (csv, excel, parquet, ipc, jsonl)
         if format in self.__df_formats:
             return self.__parse_df(source, format, schema, as_df)
 
@@ -180,3 +297,94 @@ class Sourcer():
                     data = data.get(root)
 
         return data
+
+    def __iter_df(self, schema: dict, batch_size: int, rows: Tuple[int, int] | None,
+                  start: int, on_total: Callable[[int], None] | None) -> Iterator[Tuple[int, list]]:
+        """
+        Stream the batches of a DataFrame source from its LazyFrame, without collecting the whole
+        DataFrame: scanned formats are read while the batches are used. CSV and Excel files are still
+        read whole, and a group_by needs all the rows before the first batch.
+        """
+
+        import polars as pl
+
+        source: str = schema.get("source")
+        if not source:
+            raise ValueError("Cannot get data")
+
+        if not source.startswith("http"):
+            source = self.__abs_path.joinpath(source)
+
+        lf = self.__lazy_df(source, schema.get("format"), schema)
+
+        # The number of rows is needed to split them in shards. It's not counted just for the total
+        # of a group_by, which would be computed twice
+        count = None
+        if rows or (on_total is not None and not schema.get("group_by")):
+            count = lf.select(pl.len()).collect().item()
+
+        first, end = 0, None
+        if rows:
+            first, end = self.shard_range(count, *rows)
+        elif count is not None:
+            end = count
+
+        if end is not None:
+            first = min(max(first, start), end)
+            lf = lf.slice(first, end - first)
+
+            if on_total is not None:
+                on_total(end - first)
+        elif start:
+            first = start
+            lf = lf.slice(start)
+
+        # Older versions of Polars cannot stream the batches
+        if hasattr(lf, "collect_batches"):
+            df_slices = lf.collect_batches(chunk_size=batch_size)
+        else:
+            df_slices = lf.collect().iter_slices(batch_size)
+
+        offset = first
+        for df_slice in df_slices:
+            for records_slice in df_slice.iter_slices(batch_size):
+                yield offset, records_slice.to_dicts()
+                offset += records_slice.height
+
+    def iter_data(self, schema: dict, batch_size: int = 1000, rows: Tuple[int, int] | None = None,
+                  start: int = 0, on_total: Callable[[int], None] | None = None) -> Iterator[Tuple[int, list]]:
+        """
+        Get the data like get_data(), in batches of at most batch_size records, yielding the offset
+        of the batch in the data and the records.
+
+        With rows (shard index, shard count), only the rows of the shard are read (see shard_range()).
+        The rows before start are skipped (eg. when resuming a build).
+        If the number of rows to read is known, on_total is called with it before the first batch.
+
+        Raise a ValueError if the data cannot be got.
+        """
+
+        if schema.get("format") in self.__df_formats:
+            yield from self.__iter_df(schema, batch_size, rows, start, on_total)
+            return
+
+        data = self.get_data(schema)
+        if not isinstance(data, list):
+            raise ValueError("Cannot get data")
+
+        first, end = self.shard_range(len(data), *rows) if rows else (0, len(data))
+        first = min(max(first, start), end)
+
+        if on_total is not None:
+            on_total(end - first)
+
+        for i in range(first, end, batch_size):
+            yield i, data[i:min(i + batch_size, end)]
+
+    @staticmethod
+    def shard_range(total: int, shard_index: int, shard_count: int) -> Tuple[int, int]:
+        """
+        Get the contiguous range of rows [start, end) of a shard, when the rows are split by index.
+        """
+
+        return total * shard_index // shard_count, total * (shard_index + 1) // shard_count
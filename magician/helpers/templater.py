@@ -1,6 +1,5 @@
 import re
 from typing import Dict
-from slugify import slugify
 import urllib.parse
 import hashlib
 import uuid
@@ -12,6 +11,11 @@ class Templater:
     This class is used to fill templates with data. See fill() method for the usage.
     """
 
+    # Compiled once and shared by every instance
+    __variables_re = re.compile(r"{{([^}{$]+)}}")
+    __specials_re = re.compile(r"{%([^}{$%]+)%}")
+    __functions_re = re.compile(r"\$(\w+){{([^}{$]+)}}")
+
     def __get_from_dict(self, data: Dict[str, str | dict], key: str, default: str = '') -> str:
         keys = key.split('.')
 
@@ -25,7 +29,8 @@ class Templater:
         if isinstance(current, dict):
             return default
 
-        if not current:
+        # Keep the integer zeros, like {{__index}} of the first record
+        if not current and not (isinstance(current, int) and not isinstance(current, bool)):
             return ""
 
         return current
@@ -44,6 +49,7 @@ class Templater:
             case "ucword":
                 return txt.title()
             case "slug":
+                from slugify import slugify
                 return slugify(txt)
             case "stripall":
                 return self.__remove_suffixes(txt)
@@ -163,17 +169,21 @@ class Templater:
         - {{__index}} -> the index in an array (eg. when creating objects by sources)
         """
 
+        # Nothing to fill
+        if "{" not in txt:
+            return txt.strip()
+
         # Variables
-        txt = re.sub(r"{{([^}{$]+)}}",
-                     lambda match: self.__get_from_dict(data, match.group(1).strip()).strip(), txt)
+        txt = self.__variables_re.sub(
+            lambda match: str(self.__get_from_dict(data, match.group(1).strip())).strip(), txt)
 
         # Special variables
-        txt = re.sub(r"{%([^}{$%]+)%}",
-                     lambda match: self.__get_special(match.group(1).strip()).strip(), txt)
+        txt = self.__specials_re.sub(
+            lambda match: self.__get_special(match.group(1).strip()).strip(), txt)
 
         # Functions
-        while re.search(r"\$(\w+){{([^}{$]+)}}", txt):
-            txt = re.sub(r"\$(\w+){{([^}{$]+)}}",
-                         lambda match: self.__exec_func(match.group(1), match.group(2).strip()), txt)
+        while self.__functions_re.search(txt):
+            txt = self.__functions_re.sub(
+                lambda match: self.__exec_func(match.group(1), match.group(2).strip()), txt)
 
         return txt.strip()
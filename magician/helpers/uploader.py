@@ -0,0 +1,216 @@
+from typing import Dict, Iterable, Iterator, Tuple
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+import urllib.parse
+import gzip
+import time
+
+
+class UploadError(Exception):
+    """
+    Raised when a batch cannot be uploaded.
+    """
+
+
+class Uploader:
+    """
+    This class pushes triples, in batches, to a SPARQL 1.1 Graph Store Protocol endpoint.
+
+    Batches are serialized as N-Triples (or Turtle) and POSTed to the endpoint (so they are added to the graph)
+    by a pool of threads sharing a pooled HTTP session. Failed uploads (connection errors, 429 and 5xx responses)
+    are retried with an exponential backoff.
+    """
+
+    __content_types = {
+        "nt": "application/n-triples",
+        "turtle": "text/turtle",
+    }
+
+    def __init__(self,
+                 endpoint: str,
+                 graph: str | None = None,
+                 format: str = "nt",
+                 batch_size: int = 50000,
+                 workers: int = 4,
+                 retries: int = 3,
+                 backoff: float = 1.0,
+                 gzip: bool = True,
+                 timeout: float = 300,
+                 replace: bool = False,
+                 auth: Tuple[str, str] | None = None,
+                 headers: Dict[str, str] | None = None,
+                 namespaces: Iterable[Tuple[str, str]] | None = None
+                 ) -> None:
+        """
+        - endpoint -> the URL of the Graph Store endpoint
+        - graph -> the URI of the named graph (default: the default graph)
+        - format -> the format of the batches, nt or turtle
+        - batch_size -> the number of triples in a batch
+        - workers -> the number of concurrent uploads
+        - retries -> the number of retries of a failed upload
+        - backoff -> the seconds before the first retry, doubled at every retry
+        - gzip -> compress the request bodies
+        - timeout -> the timeout of a request, in seconds
+        - replace -> clear the graph before uploading
+        - auth -> user and password for the basic authentication
+        - headers -> other headers of the requests
+        - namespaces -> the prefixes used in the Turtle batches
+        """
+
+        if format not in self.__content_types:
+            raise ValueError("Unsupported upload format: {}".format(format))
+
+        self.__endpoint = endpoint
+        self.__graph = graph
+        self.__format = format
+        self.__batch_size = max(int(batch_size), 1)
+        self.__workers = max(int(workers), 1)
+        self.__retries = max(int(retries), 0)
+        self.__backoff = backoff
+        self.__gzip = gzip
+        self.__timeout = timeout
+        self.__replace = replace
+        self.__auth = tuple(auth) if auth else None
+        self.__headers = headers or {}
+        self.__namespaces = list(namespaces or [])
+
+    def __url(self) -> str:
+        separator = "&" if "?" in self.__endpoint else "?"
+
+        if self.__graph:
+            return self.__endpoint + separator + "graph=" + urllib.parse.quote(self.__graph, safe="")
+
+        return self.__endpoint + separator + "default"
+
+    def __session(self):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+
+        # A connection for each worker, reused between the batches
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.__workers, max_retries=0)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+        if self.__auth:
+            session.auth = self.__auth
+
+        session.headers.update(self.__headers)
+
+        return session
+
+    def __batches(self, lines: Iterable[str]) -> Iterator[list[str]]:
+        batch = []
+        for line in lines:
+            batch.append(line)
+
+            if len(batch) >= self.__batch_size:
+                yield batch
+                batch = []
+
+        if batch:
+            yield batch
+
+    def __serialize(self, batch: list[str]) -> bytes:
+        if self.__format == "turtle":
+            from rdflib import Graph
+
+            g = Graph(bind_namespaces="none")
+            for prefix, namespace in self.__namespaces:
+                g.bind(prefix, namespace)
+
+            g.parse(data="".join(batch), format="nt")
+
+            return g.serialize(format="turtle", encoding="utf-8")
+
+        return "".join(batch).encode("utf-8")
+
+    def __request(self, session, method: str, body: bytes | None = None, ok: Tuple[int, ...] = ()) -> None:
+        """
+        Send a request, retrying on connection errors, 429 and 5xx responses.
+        """
+
+        import requests
+
+        headers = {}
+        if body is not None:
+            headers["Content-Type"] = self.__content_types[self.__format] + "; charset=utf-8"
+
+            if self.__gzip:
+                body = gzip.compress(body, compresslevel=5)
+                headers["Content-Encoding"] = "gzip"
+
+        for attempt in range(self.__retries + 1):
+            error = None
+            try:
+                response = session.request(
+                    method, self.__url(), data=body, headers=headers, timeout=self.__timeout
+                )
+
+                if response.ok or response.status_code in ok:
+                    return
+
+                error = "{} {}: {}".format(response.status_code, response.reason, response.text[:200])
+
+                # Client errors will fail again
+                if response.status_code < 500 and response.status_code != 429:
+                    break
+            except requests.RequestException as e:
+                error = str(e)
+
+            if attempt < self.__retries:
+                time.sleep(self.__backoff * (2 ** attempt))
+
+        raise UploadError("Cannot {} {}: {}".format(method, self.__url(), error))
+
+    def __upload_batch(self, session, batch: list[str]) -> int:
+        body = self.__serialize(batch)
+        self.__request(session, "POST", body)
+
+        return len(body)
+
+    def upload(self, lines: Iterable[str]) -> dict:
+        """
+        Upload the triples, given as N-Triples lines, raising an UploadError if a batch fails.
+
+        At most twice the number of workers batches are kept in memory. Return the number of batches,
+        triples and uploaded bytes (before compression) and the seconds spent.
+        """
+
+        stats = {"batches": 0, "triples": 0, "bytes": 0, "seconds": 0.0}
+        start = time.perf_counter()
+
+        with self.__session() as session:
+            if self.__replace:
+                # Clear the graph, that may not exist yet
+                self.__request(session, "DELETE", ok=(404,))
+
+            with ThreadPoolExecutor(max_workers=self.__workers) as executor:
+                pending: set[Future] = set()
+
+                def collect(futures: set[Future]) -> None:
+                    for future in futures:
+                        stats["bytes"] += future.result()
+
+                try:
+                    for batch in self.__batches(lines):
+                        # Backpressure: wait for a batch to be uploaded before reading more
+                        if len(pending) >= self.__workers * 2:
+                            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                            collect(done)
+
+                        pending.add(executor.submit(self.__upload_batch, session, batch))
+                        stats["batches"] += 1
+                        stats["triples"] += len(batch)
+
+                    done, pending = wait(pending)
+                    collect(done)
+                except BaseException:
+                    for future in pending:
+                        future.cancel()
+
+                    raise
+
+        stats["seconds"] = time.perf_counter() - start
+
+        return stats
@@ -7,11 +7,12 @@ class Urifier:
     This class generate URIs expanding namespaces bindings and adding the default namespace.
     """
 
-    __namespaces: Dict[str, str] = {}
+    __namespaces: Dict[str, str] = None
     __namespace: Namespace | None = ""
 
     def __init__(self, namespaces: Generator[Tuple[str, URIRef], None, None] | List[Tuple[str, URIRef | str]], namespace: str | None) -> None:
-        # Add bindings
+        # Add bindings, per instance: a process can build many schemas
+        self.__namespaces = {}
         for binding, bind_namespace in namespaces:
             self.__namespaces[binding] = str(bind_namespace)
 
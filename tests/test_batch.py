@@ -0,0 +1,113 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from magician import batch
+from magician.batch import parse_schemas
+from magician.cli import main
+
+
+SCHEMA = """
+namespace: https://example.org/
+prefixes:
+  schema: https://schema.org/
+export:
+  parent: ./out
+  name: {name}
+  formats: [nt]
+individuals:
+  italy:
+    as: schema:Country
+sources:
+  - source: {source}
+    format: csv
+    object:
+      uri: person/{{{{id}}}}
+      as: schema:Person
+"""
+
+
+@pytest.fixture
+def schemas(tmp_path):
+    (tmp_path / "data.csv").write_text("id\n1\n2\n", encoding="utf-8")
+
+    for name, source in [("a", "data.csv"), ("b", "missing.csv"), ("crash", "data.csv")]:
+        (tmp_path / "{}.yaml".format(name)).write_text(SCHEMA.format(name=name, source=source), encoding="utf-8")
+
+    (tmp_path / "broken.yaml").write_text("export: [\n", encoding="utf-8")
+
+    return tmp_path
+
+
+def test_failing_schema_does_not_stop_the_batch(schemas):
+    files = [schemas / "broken.yaml", schemas / "a.yaml", schemas / "b.yaml"]
+    results = parse_schemas(files, workers=2)
+
+    assert [result["schema"] for result in results] == [str(file) for file in files]
+    assert [result["ok"] for result in results] == [False, True, True]
+    assert "yaml" in results[0]["error"].lower()
+
+    assert (schemas / "out" / "a.nt").exists()
+    assert (schemas / "out" / "b.nt").exists()
+
+
+def test_unread_sources_are_reported(schemas, capsys):
+    result, = parse_schemas(schemas / "b.yaml")
+
+    assert result["ok"]
+    assert result["failed_sources"] == ["missing.csv"]
+    assert batch.status(result) == "⚠️"
+
+    assert main(["batch", str(schemas / "a.yaml"), str(schemas / "b.yaml"), "-w", "2"]) == 0
+
+    output = capsys.readouterr()
+    assert "Sources not read in {}: missing.csv".format(schemas / "b.yaml") in output.err
+    assert "1 built, 1 without some sources, 0 failed" in output.out
+
+
+CRASHING_BATCH = """
+import os
+import sys
+
+from magician import batch
+
+parse_schema = batch.parse_schema
+
+
+def crashing_parse_schema(schema_file, *args, **kwargs):
+    # Like a worker killed by the OOM killer
+    if schema_file.name == "crash.yaml":
+        os._exit(1)
+
+    return parse_schema(schema_file, *args, **kwargs)
+
+
+# Also in the spawned workers, which import this script again
+batch.parse_schema = crashing_parse_schema
+
+if __name__ == "__main__":
+    results = batch.parse_schemas(sys.argv[1:], workers=2)
+    for result in results:
+        print("RESULT", result["ok"], ",".join(result["failed_sources"]), "BrokenProcessPool" in (result["error"] or ""))
+"""
+
+
+def test_dying_worker_fails_only_its_schema(schemas):
+    (schemas / "crashing_batch.py").write_text(CRASHING_BATCH, encoding="utf-8")
+
+    files = [schemas / "crash.yaml", schemas / "a.yaml", schemas / "b.yaml", schemas / "broken.yaml"]
+    process = subprocess.run(
+        [sys.executable, str(schemas / "crashing_batch.py")] + [str(file) for file in files],
+        capture_output=True, text=True, timeout=300,
+        env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    )
+
+    assert process.returncode == 0, process.stderr
+    assert [line for line in process.stdout.splitlines() if line.startswith("RESULT")] == [
+        "RESULT False  True",
+        "RESULT True  False",
+        "RESULT True missing.csv False",
+        "RESULT False  False",
+    ]
@@ -0,0 +1,147 @@
+import os
+
+import pytest
+from rdflib import Literal, URIRef
+
+import magician
+from magician.helpers import ObjectParser
+from magician.helpers.checkpointer import Checkpointer
+
+
+def triple(i: int) -> tuple:
+    return URIRef("https://example.org/s/{}".format(i)), URIRef("https://example.org/p"), Literal(i)
+
+
+def test_checkpointer_resume_truncates_to_last_commit(tmp_path):
+    """
+    The triples written after the last commit are discarded when resuming.
+    """
+
+    filename = tmp_path / "out"
+
+    checkpointer = Checkpointer(filename, "run", [], interval=3600)
+    checkpointer.commit(individuals=True)
+    for i in range(10):
+        checkpointer.add(triple(i))
+    checkpointer.commit(0, 10, done=True)
+    for i in range(10, 15):
+        checkpointer.add(triple(i))
+    checkpointer.commit(1, 5, force=True)
+    committed = os.path.getsize(checkpointer.partial_filename)
+
+    # Not committed, then the build crashes
+    for i in range(15, 20):
+        checkpointer.add(triple(i))
+    checkpointer.commit(1, 10)
+    del checkpointer
+    assert os.path.getsize(tmp_path / "out.partial.nt") > committed
+
+    checkpointer = Checkpointer(filename, "run", [], resume=True)
+    assert checkpointer.resumed
+    assert checkpointer.individuals_done()
+    assert checkpointer.source_done(0)
+    assert not checkpointer.source_done(1)
+    assert checkpointer.source_rows(1) == 5
+    assert os.path.getsize(checkpointer.partial_filename) == committed
+
+    for i in range(15, 20):
+        checkpointer.add(triple(i))
+    checkpointer.close()
+
+    with open(checkpointer.partial_filename, encoding="utf-8") as fp:
+        assert len(fp.readlines()) == 20
+
+    checkpointer.finish()
+    assert not os.path.exists(checkpointer.partial_filename)
+    assert not os.path.exists(checkpointer.state_filename)
+
+
+def test_checkpointer_ignores_other_runs(tmp_path):
+    checkpointer = Checkpointer(tmp_path / "out", "run", [])
+    checkpointer.add(triple(0))
+    checkpointer.commit(0, 1, done=True)
+    checkpointer.close()
+
+    checkpointer = Checkpointer(tmp_path / "out", "other run", [], resume=True)
+    assert not checkpointer.resumed
+    assert not checkpointer.source_done(0)
+    assert os.path.getsize(checkpointer.partial_filename) == 0
+    checkpointer.close()
+
+
+@pytest.mark.parametrize("pipeline", [False, True])
+def test_parse_schema_resumes_after_crash(tmp_path, monkeypatch, pipeline):
+    """
+    A build crashing midway and resumed gives the same output as a build without crashes.
+    """
+
+    (tmp_path / "data.csv").write_text(
+        "id,name\n" + "".join("{},n{}\n".format(i, i % 50) for i in range(500)), encoding="utf-8"
+    )
+    (tmp_path / "groups.csv").write_text(
+        "k,v\n" + "".join("k{},{}\n".format((i * 7919) % 400, i % 10) for i in range(4000)), encoding="utf-8"
+    )
+    (tmp_path / "schema.yaml").write_text("""
+namespace: https://example.org/
+prefixes:
+  schema: https://schema.org/
+export:
+  parent: ./out
+  name: out
+  formats: [nt]
+  streaming: true
+individuals:
+  italy:
+    as: schema:Country
+sources:
+  - source: data.csv
+    format: csv
+    object:
+      uri: person/{{id}}
+      as: schema:Person
+      predicates:
+        schema:name: "{{name}}"
+        schema:position: "{{__index}}"
+  - source: groups.csv
+    format: csv
+    group_by: k
+    group_agg:
+      v: sum
+    object:
+      uri: group/{{k}}
+      predicates:
+        schema:position: "{{__index}}"
+        schema:value: "{{v}}"
+""", encoding="utf-8")
+
+    schema_file = tmp_path / "schema.yaml"
+    output = tmp_path / "out" / "out.nt"
+
+    magician.parse_schema(schema_file, pipeline=pipeline, batch_size=40)
+    expected = output.read_bytes()
+    output.unlink()
+
+    add_object = ObjectParser.add_object
+    calls = {"count": 0}
+
+    def crashing_add_object(self, *args, **kwargs):
+        calls["count"] += 1
+        if calls["count"] == 777:
+            raise KeyboardInterrupt()
+
+        return add_object(self, *args, **kwargs)
+
+    monkeypatch.setattr(ObjectParser, "add_object", crashing_add_object)
+    # The build crashes in the middle of the grouped source
+    with pytest.raises(KeyboardInterrupt):
+        magician.parse_schema(schema_file, pipeline=pipeline, batch_size=40, checkpoint=True, checkpoint_interval=0)
+
+    assert not output.exists()
+    assert (tmp_path / "out" / "out.checkpoint.json").exists()
+
+    monkeypatch.setattr(ObjectParser, "add_object", add_object)
+    magician.parse_schema(schema_file, pipeline=pipeline, batch_size=40, resume=True)
+
+    assert output.read_bytes() == expected
+    assert len(output.read_bytes().splitlines()) == 1 + 500 * 3 + 400 * 2
+    assert not (tmp_path / "out" / "out.checkpoint.json").exists()
@@ -0,0 +1,85 @@
+import tempfile
+
+import pytest
+
+import magician
+from magician.helpers import ObjectParser
+from magician.helpers.deduper import Deduper
+
+
+def test_deduper_merges_spilled_chunks(tmp_path):
+    """
+    Lines over the memory budget are spilled, the merged output is sorted and unique.
+    """
+
+    lines = ["<urn:s{}> <urn:p> \"o\\u0085{}\" .\n".format(i % 7000, i % 13) for i in range(30000)]
+
+    with Deduper(memory=1, tmp_dir=tmp_path) as deduper:
+        for line in lines:
+            deduper.add(line)
+
+        assert list(tmp_path.glob("magician-*.nt"))
+
+        count = deduper.write(tmp_path / "out.nt")
+
+    expected = sorted(set(lines))
+    assert count == len(expected)
+    assert (tmp_path / "out.nt").read_text(encoding="utf-8").split("\n")[:-1] == [line[:-1] for line in expected]
+
+    # The chunk files are removed when closing
+    assert not list(tmp_path.glob("magician-*.nt"))
+
+
+def test_deduper_prefilter():
+    with Deduper(prefilter=2) as deduper:
+        for line in ["a\n", "b\n", "a\n", "c\n", "a\n", "b\n"]:
+            deduper.add(line)
+
+        assert list(deduper) == ["a\n", "b\n", "c\n"]
+
+
+def test_failed_build_removes_chunk_files(tmp_path, monkeypatch):
+    """
+    The chunk files of a streaming build are removed also if the build fails.
+    """
+
+    (tmp_path / "data.csv").write_text(
+        "id\n" + "".join("{}\n".format(i) for i in range(3000)), encoding="utf-8"
+    )
+    (tmp_path / "schema.yaml").write_text("""
+namespace: https://example.org/
+export:
+  name: out
+  formats: [nt]
+  streaming: true
+  dedup_memory: 1
+sources:
+  - source: data.csv
+    format: csv
+    object:
+      uri: thing/{{id}}
+      predicates:
+        https://schema.org/name: "{{id}} %s"
+""" % ("x" * 500), encoding="utf-8")
+
+    (tmp_path / "tmp").mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path / "tmp"))
+
+    add_object = ObjectParser.add_object
+    calls = {"count": 0}
+
+    def crashing_add_object(self, *args, **kwargs):
+        calls["count"] += 1
+        if calls["count"] == 2500:
+            assert list((tmp_path / "tmp").glob("magician-*.nt"))
+            raise RuntimeError("crash")
+
+        return add_object(self, *args, **kwargs)
+
+    monkeypatch.setattr(ObjectParser, "add_object", crashing_add_object)
+
+    with pytest.raises(RuntimeError):
+        magician.parse_schema(tmp_path / "schema.yaml")
+
+    assert calls["count"] == 2500
+    assert not list((tmp_path / "tmp").glob("magician-*"))
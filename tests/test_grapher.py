@@ -0,0 +1,118 @@
+import hashlib
+import json
+
+from rdflib import BNode, Graph, Literal, URIRef
+from rdflib.compare import isomorphic
+from rdflib.namespace import XSD
+
+from magician.helpers import Grapher
+from magician.helpers.ntriples import nt_row
+from magician.helpers.packer import Unpacker
+
+
+def triples() -> list[tuple]:
+    p = URIRef("https://example.org/p")
+    triples = []
+    for i in range(200):
+        s = URIRef("https://example.org/s/{}".format(i))
+        triples += [(s, p, Literal(i)), (s, p, Literal("a\x85b {}".format(i % 5))), (s, p, BNode("b{}".format(i % 3)))]
+
+    return triples
+
+
+def build(tmp_path, name: str, **options) -> Grapher:
+    grapher = Grapher("https://example.org/", {"ex": "https://example.org/"}, tmp_path / name, **options)
+
+    g = grapher.create()
+    for triple in triples() + triples()[:50]:
+        g.add(triple)
+
+    grapher.save(g)
+
+    return grapher
+
+
+def test_shards_add_up_to_the_export(tmp_path):
+    build(tmp_path, "whole", formats=["nt"])
+    grapher = build(tmp_path, "export", formats=["nt", "turtle"], shards=3)
+
+    with open(tmp_path / "export.manifest.json", encoding="utf-8") as fp:
+        manifest = json.load(fp)
+
+    assert manifest["shards"] == 3
+    assert manifest["triples"] == len(set(triples()))
+    assert [(file["shard"], file["format"]) for file in manifest["files"]] == [
+        (shard, format) for shard in range(3) for format in ["nt", "turtle"]
+    ]
+
+    lines = []
+    for file in manifest["files"]:
+        content = (tmp_path / file["file"]).read_bytes()
+        assert file["file"].startswith(tmp_path.joinpath(grapher.shard_filename(file["shard"])).name)
+        assert file["bytes"] == len(content)
+        assert file["sha256"] == hashlib.sha256(content).hexdigest()
+
+        if file["format"] == "nt":
+            shard_lines = content.decode("utf-8").split("\n")[:-1]
+            assert len(shard_lines) == file["triples"]
+
+            # All the triples of a subject are in the same shard
+            assert {Grapher.shard_of(line[:line.index(" ")], 3) for line in shard_lines} <= {file["shard"]}
+            lines += shard_lines
+        else:
+            assert len(Graph().parse(tmp_path / file["file"], format="turtle")) == file["triples"]
+
+    whole = (tmp_path / "whole.nt").read_text(encoding="utf-8").split("\n")[:-1]
+    assert sorted(lines) == whole
+    assert sum(file["triples"] for file in manifest["files"] if file["format"] == "nt") == manifest["triples"]
+
+
+def test_streaming_export_matches_graph_export(tmp_path):
+    """
+    The formats saved from the deduplicated triples are the same as the ones saved from a graph.
+    """
+
+    build(tmp_path, "graph", formats=["nt", "turtle", "binary"])
+    build(tmp_path, "streaming", formats=["nt", "turtle", "binary"], streaming=True)
+
+    assert (tmp_path / "streaming.nt").read_bytes() == (tmp_path / "graph.nt").read_bytes()
+
+    for extension, format in [("ttl", "turtle"), ("mrdf", None)]:
+        graphs = []
+        for name in ["graph", "streaming"]:
+            if format:
+                graphs.append(Graph().parse(tmp_path / "{}.{}".format(name, extension), format=format))
+            else:
+                with open(tmp_path / "{}.{}".format(name, extension), "rb") as fp:
+                    graphs.append(Unpacker(fp).to_graph())
+
+        assert isomorphic(*graphs)
+
+
+def test_streaming_chunks_share_blank_nodes(tmp_path):
+    grapher = Grapher("https://example.org/", {}, tmp_path / "export", formats=["nt"], streaming=True)
+
+    g = grapher.create()
+    for triple in triples():
+        g.add(triple)
+
+    try:
+        chunked = Graph()
+        for triple in grapher._Grapher__triples(g, chunk_size=7):
+            chunked.add(triple)
+    finally:
+        g.deduper.close()
+
+    assert len(chunked) == len(set(triples()))
+    assert len({o for _, _, o in chunked if isinstance(o, BNode)}) == 3
+
+
+def test_nt_row_matches_rdflib():
+    from rdflib.plugins.serializers.nt import _nt_row
+
+    s, p = URIRef("https://example.org/s"), URIRef("https://example.org/p")
+    for o in [
+        URIRef("https://example.org/o"), BNode("b"), Literal("a\\b\n\r\"c\x85"), Literal("ciao", lang="it"),
+        Literal("1", datatype=XSD.integer), Literal("à"),
+    ]:
+        assert nt_row((s, p, o)) == _nt_row((s, p, o))
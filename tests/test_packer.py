@@ -0,0 +1,54 @@
+from io import BytesIO
+
+import pytest
+from rdflib import BNode, Literal, URIRef
+from rdflib.namespace import XSD
+
+from magician.helpers.packer import Packer, Unpacker
+
+
+def test_packer_round_trip():
+    """
+    Every kind of term is read back unchanged, also across frames sharing the term dictionary.
+    """
+
+    p = URIRef("https://example.org/p")
+    triples = [
+        (URIRef("https://example.org/s/{}".format(i)), p, o)
+        for i, o in enumerate([
+            URIRef("https://example.org/o"),
+            BNode("b0"),
+            Literal("plain"),
+            Literal("ciao", lang="it"),
+            Literal("42", datatype=XSD.integer),
+            Literal("àè \n \"quoted\" \x85"),
+            Literal("", datatype=XSD.string),
+        ])
+    ]
+    triples.append((BNode("b0"), p, Literal("42", datatype=XSD.integer)))
+
+    fp = BytesIO()
+    with Packer(fp, frame_size=3) as packer:
+        for triple in triples:
+            packer.add(triple)
+
+    fp.seek(0)
+    unpacked = list(Unpacker(fp))
+
+    assert unpacked == triples
+    assert [type(term) for triple in unpacked for term in triple] == [type(term) for triple in triples for term in triple]
+    assert unpacked[3][2].language == "it"
+    assert unpacked[4][2].datatype == XSD.integer
+
+
+def test_unpacker_rejects_other_files():
+    with pytest.raises(ValueError):
+        Unpacker(BytesIO(b"<urn:s> <urn:p> <urn:o> .\n"))
+
+
+def test_empty_file_has_no_triples():
+    fp = BytesIO()
+    Packer(fp).close()
+
+    fp.seek(0)
+    assert list(Unpacker(fp)) == []
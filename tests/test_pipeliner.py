@@ -0,0 +1,95 @@
+import pytest
+
+import magician
+from magician.helpers.pipeliner import Pipeliner, TripleCollector
+
+
+def test_pipeline_keeps_the_order_of_the_batches():
+    written = []
+
+    stats = Pipeliner(queue_size=2).run(range(100), lambda batch: batch * 2, written.append)
+
+    assert written == [i * 2 for i in range(100)]
+    assert [stats[name]["batches"] for name in ["reader", "mapper", "writer"]] == [100, 100, 100]
+    assert all(0 <= stage["utilisation"] <= 1 for stage in stats.values())
+
+
+@pytest.mark.parametrize("stage", ["reader", "mapper", "writer"])
+def test_pipeline_raises_the_error_of_any_stage(stage):
+    def fail_at(name, value):
+        if stage == name and value == 50:
+            raise ValueError(name)
+
+        return value
+
+    def batches():
+        for i in range(1000):
+            yield fail_at("reader", i)
+
+    with pytest.raises(ValueError, match=stage):
+        Pipeliner(queue_size=2).run(batches(), lambda batch: fail_at("mapper", batch), lambda batch: fail_at("writer", batch))
+
+
+def test_collector_hands_out_the_triples_once():
+    collector = TripleCollector()
+    collector.add((1, 2, 3))
+    collector.add((4, 5, 6))
+
+    assert collector.take() == [(1, 2, 3), (4, 5, 6)]
+    assert collector.take() == []
+
+
+SCHEMA = """
+namespace: https://example.org/
+prefixes:
+  schema: https://schema.org/
+export:
+  parent: ./{name}
+  name: export
+  formats: [nt]
+individuals:
+  italy:
+    as: schema:Country
+sources:
+  - source: people.csv
+    format: csv
+    join:
+      source: cities.csv
+      format: csv
+      left_on: city
+      right_on: city
+    object:
+      - uri: person/{{{{id}}}}
+        as: schema:Person
+        predicates:
+          schema:name: "{{{{name}}}}"
+          schema:position: "{{{{__index}}}}"
+          schema:address:
+            type: literal
+            value: "{{{{city}}}} {{{{region}}}}"
+      - uri: city/{{{{city}}}}
+        as: schema:City
+  - source: missing.csv
+    format: csv
+    object:
+      uri: thing/{{{{id}}}}
+"""
+
+
+def test_pipeline_matches_sequential_build(tmp_path):
+    (tmp_path / "people.csv").write_text(
+        "id,name,city\n" + "".join("{},n{},{}\n".format(i, i % 7, ["Rome", "Milan", "Turin"][i % 3]) for i in range(350)),
+        encoding="utf-8"
+    )
+    (tmp_path / "cities.csv").write_text("city,region\nRome,Lazio\nMilan,Lombardia\n", encoding="utf-8")
+
+    for name, pipeline in [("sequential", False), ("pipeline", True)]:
+        (tmp_path / "{}.yaml".format(name)).write_text(SCHEMA.format(name=name), encoding="utf-8")
+
+        assert magician.parse_schema(tmp_path / "{}.yaml".format(name), pipeline=pipeline, batch_size=40) == [
+            "missing.csv"
+        ]
+
+    sequential = (tmp_path / "sequential" / "export.nt").read_bytes()
+    assert sequential == (tmp_path / "pipeline" / "export.nt").read_bytes()
+    assert len(sequential.splitlines()) == 1 + 350 * 4 + 3
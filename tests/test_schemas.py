@@ -0,0 +1,92 @@
+import datetime
+import os
+
+import pytest
+
+from magician import helpers
+from magician.helpers import loadSchema
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    cache_dir = tmp_path / "cache"
+    monkeypatch.setattr(helpers, "SCHEMA_CACHE_DIR", cache_dir)
+    helpers.__dict__["__schemas_cache"].clear()
+
+    yield cache_dir
+
+    helpers.__dict__["__schemas_cache"].clear()
+
+
+def forget_process_cache():
+    """
+    Forget the schemas resolved in the process, like a new run, so the disk cache is used.
+    """
+
+    helpers.__dict__["__schemas_cache"].clear()
+
+
+def write(path, content: str, mtime_ns: int | None = None) -> None:
+    path.write_text(content, encoding="utf-8")
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_base_change_invalidates_cache(tmp_path, cache_dir):
+    write(tmp_path / "base.yaml", "namespace: https://a.org/\nprefixes:\n  a: https://a.org/\n")
+    write(tmp_path / "schema.yaml", "extends: base.yaml\nprefixes:\n  b: https://b.org/\n")
+
+    schema = loadSchema(tmp_path / "schema.yaml")
+    assert schema == {"namespace": "https://a.org/", "prefixes": {"a": "https://a.org/", "b": "https://b.org/"}}
+    assert list(cache_dir.glob("*.json"))
+
+    # Same size, newer mtime: the hash is checked
+    stat = os.stat(tmp_path / "base.yaml")
+    write(tmp_path / "base.yaml", "namespace: https://c.org/\nprefixes:\n  a: https://c.org/\n", stat.st_mtime_ns + 10**9)
+    assert loadSchema(tmp_path / "schema.yaml")["namespace"] == "https://c.org/"
+
+    write(tmp_path / "base.yaml", "namespace: https://changed.org/\n")
+    forget_process_cache()
+    assert loadSchema(tmp_path / "schema.yaml")["namespace"] == "https://changed.org/"
+
+
+def test_missing_extends_file_appearing_invalidates_cache(tmp_path):
+    write(tmp_path / "schema.yaml", "extends: base.yaml\nnamespace: https://b.org/\n")
+
+    assert loadSchema(tmp_path / "schema.yaml") == {"namespace": "https://b.org/"}
+
+    write(tmp_path / "base.yaml", "namespace: https://a.org/\nexport:\n  name: a\n")
+    assert loadSchema(tmp_path / "schema.yaml") == {"namespace": "https://b.org/", "export": {"name": "a"}}
+
+    (tmp_path / "base.yaml").unlink()
+    forget_process_cache()
+    assert loadSchema(tmp_path / "schema.yaml") == {"namespace": "https://b.org/"}
+
+
+def test_disk_cache_is_json_and_keeps_dates(tmp_path, cache_dir):
+    write(tmp_path / "schema.yaml", "individuals:\n  a:\n    date: 2024-01-02\n    time: 2024-01-02 03:04:05\n")
+
+    schema = loadSchema(tmp_path / "schema.yaml")
+    forget_process_cache()
+
+    assert loadSchema(tmp_path / "schema.yaml") == schema
+    assert schema["individuals"]["a"]["date"] == datetime.date(2024, 1, 2)
+    assert schema["individuals"]["a"]["time"] == datetime.datetime(2024, 1, 2, 3, 4, 5)
+
+    cache_file, = cache_dir.glob("*.json")
+    assert cache_file.read_text(encoding="utf-8").startswith("{")
+
+
+def test_cached_schema_is_a_copy(tmp_path):
+    write(tmp_path / "schema.yaml", "prefixes:\n  a: https://a.org/\n")
+
+    loadSchema(tmp_path / "schema.yaml")["prefixes"]["b"] = "https://b.org/"
+
+    assert loadSchema(tmp_path / "schema.yaml") == {"prefixes": {"a": "https://a.org/"}}
+
+
+def test_python_tags_are_rejected(tmp_path):
+    write(tmp_path / "schema.yaml", "value: !!python/object/apply:os.getcwd []\n")
+
+    with pytest.raises(Exception):
+        loadSchema(tmp_path / "schema.yaml")
@@ -0,0 +1,86 @@
+import random
+
+import pytest
+
+import magician
+
+
+SCHEMA = """
+namespace: https://example.org/
+prefixes:
+  schema: https://schema.org/
+export:
+  parent: ./out
+  name: export
+  formats: [nt]
+individuals:
+  italy:
+    as: schema:Country
+  france:
+    as: schema:Country
+sources:
+  - source: rows.csv
+    format: csv
+    group_by: k
+    group_agg:
+      v: sum
+    object:
+      uri: group/{{k}}
+      predicates:
+        schema:position: "{{__index}}"
+        schema:value: "{{v}}"
+  - source: people.csv
+    format: csv
+    join:
+      source: tags.csv
+      format: csv
+      left_on: id
+      right_on: id
+    object:
+      uri: person/{{id}}/{{__index}}
+      predicates:
+        schema:keywords: "{{tag}}"
+  - source: people.csv
+    format: csv
+    shard_key: id
+    object:
+      uri: keyed/{{id}}
+"""
+
+
+@pytest.fixture
+def schema_file(tmp_path):
+    generator = random.Random(42)
+
+    keys = ["k{}".format(generator.randrange(1500)) for _ in range(10000)]
+    (tmp_path / "rows.csv").write_text(
+        "k,v\n" + "".join("{},{}\n".format(key, generator.randrange(100)) for key in keys), encoding="utf-8"
+    )
+    (tmp_path / "people.csv").write_text("id\n" + "".join("{}\n".format(i) for i in range(300)), encoding="utf-8")
+    (tmp_path / "tags.csv").write_text(
+        "id,tag\n" + "".join("{},t{}\n".format(generator.randrange(300), i) for i in range(900)), encoding="utf-8"
+    )
+    (tmp_path / "schema.yaml").write_text(SCHEMA, encoding="utf-8")
+
+    return tmp_path / "schema.yaml"
+
+
+def test_merged_shards_match_the_whole_build(schema_file):
+    output = schema_file.parent / "out" / "export.nt"
+
+    magician.parse_schema(schema_file)
+    expected = output.read_bytes()
+    output.unlink()
+
+    for shard_index in range(3):
+        magician.parse_schema(schema_file, shard_index=shard_index, shard_count=3, batch_size=500)
+
+    magician.merge_shards(schema_file)
+
+    assert output.read_bytes() == expected
+
+
+@pytest.mark.parametrize("shard_index,shard_count", [(0, None), (0, 1), (3, 3), (None, 3)])
+def test_invalid_shards(schema_file, shard_index, shard_count):
+    with pytest.raises(ValueError):
+        magician.parse_schema(schema_file, shard_index=shard_index, shard_count=shard_count)
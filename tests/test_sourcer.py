@@ -0,0 +1,94 @@
+import polars as pl
+import pytest
+
+from magician.helpers import Sourcer
+
+
+@pytest.fixture
+def sources(tmp_path):
+    people = pl.DataFrame({
+        "id": [1, 2, 3, 4, 5],
+        "name": ["Alice", "Bob", "Carl", "Dora", "Emma"],
+        "city": ["Rome", "Milan", "Rome", "Turin", "Milan"],
+        "score": [1.5, 2.0, 3.0, 4.0, 0.5],
+    })
+
+    people.write_parquet(tmp_path / "people.parquet")
+    people.write_ipc(tmp_path / "people.arrow")
+    people.write_ndjson(tmp_path / "people.jsonl")
+
+    (tmp_path / "cities.csv").write_text("city,region\nRome,Lazio\nMilan,Lombardia\n", encoding="utf-8")
+    pl.DataFrame({"region": ["Lazio", "Lombardia"], "code": ["LAZ", "LOM"]}).write_parquet(tmp_path / "regions.parquet")
+
+    return tmp_path
+
+
+FORMATS = [("people.parquet", "parquet"), ("people.arrow", "ipc"), ("people.arrow", "arrow"), ("people.jsonl", "jsonl")]
+
+
+@pytest.mark.parametrize("source,format", FORMATS)
+def test_values_are_strings(sources, source, format):
+    data = Sourcer(sources).get_data({"source": source, "format": format})
+
+    assert data[0] == {"id": "1", "name": "Alice", "city": "Rome", "score": "1.5"}
+    assert len(data) == 5
+
+
+@pytest.mark.parametrize("source,format", FORMATS)
+def test_columns_and_nested_joins(sources, source, format):
+    schema = {
+        "source": source,
+        "format": format,
+        "columns": ["id", "city"],
+        "join": {
+            "source": "cities.csv",
+            "format": "csv",
+            "left_on": "city",
+            "right_on": "city",
+            "join": {"source": "regions.parquet", "format": "parquet", "left_on": "region", "right_on": "region"},
+        },
+    }
+
+    data = Sourcer(sources).get_data(schema)
+
+    assert data == [
+        {"id": "1", "city": "Rome", "region": "Lazio", "code": "LAZ"},
+        {"id": "2", "city": "Milan", "region": "Lombardia", "code": "LOM"},
+        {"id": "3", "city": "Rome", "region": "Lazio", "code": "LAZ"},
+        {"id": "4", "city": "Turin", "region": None, "code": None},
+        {"id": "5", "city": "Milan", "region": "Lombardia", "code": "LOM"},
+    ]
+
+    # The batches have the same records
+    batches = list(Sourcer(sources).iter_data(schema, 2))
+    assert [offset for offset, _ in batches] == [0, 2, 4]
+    assert [record for _, records in batches for record in records] == data
+
+
+@pytest.mark.parametrize("source,format", FORMATS)
+def test_group_by(sources, source, format):
+    data = Sourcer(sources).get_data({
+        "source": source, "format": format, "group_by": "city", "group_agg": {"score": "sum", "name": "list"}
+    })
+
+    assert sorted((record["city"], float(record["score"]), sorted(record["name"])) for record in data) == [
+        ("Milan", 2.5, ["Bob", "Emma"]),
+        ("Rome", 4.5, ["Alice", "Carl"]),
+        ("Turin", 4.0, ["Dora"]),
+    ]
+
+
+def test_join_with_missing_column_is_skipped(sources):
+    data = Sourcer(sources).get_data({
+        "source": "people.parquet",
+        "format": "parquet",
+        "join": {"source": "cities.csv", "format": "csv", "left_on": "town", "right_on": "city"},
+    })
+
+    assert "region" not in data[0]
+    assert len(data) == 5
+
+
+def test_missing_source(sources):
+    with pytest.raises(Exception):
+        list(Sourcer(sources).iter_data({"source": "missing.parquet", "format": "parquet"}))
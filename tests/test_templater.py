@@ -0,0 +1,18 @@
+import pytest
+
+from magician.helpers import Templater
+
+
+@pytest.mark.parametrize("value,expected", [
+    (0, "a0b"), (3, "a3b"), ("x", "axb"), (False, "ab"), (0.0, "ab"), ("", "ab"), (None, "ab"),
+])
+def test_only_integer_zeros_are_kept(value, expected):
+    assert Templater().fill("a{{x}}b", {"x": value}) == expected
+
+
+def test_nested_values():
+    templater = Templater()
+
+    assert templater.fill("{{a.b}}", {"a": {"b": "c"}}) == "c"
+    assert templater.fill("{{a}}", {"a": {"b": "c"}}) == ""
+    assert templater.fill("no variables", {}) == "no variables"
@@ -0,0 +1,123 @@
+import gzip
+import http.server
+import threading
+
+import pytest
+
+from magician.helpers.uploader import Uploader, UploadError
+
+
+class Store(http.server.ThreadingHTTPServer):
+    """
+    A Graph Store stand-in, keeping the requests and answering with the queued statuses first.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), StoreHandler)
+        self.requests = []
+        self.statuses = []
+        self.lock = threading.Lock()
+
+    @property
+    def endpoint(self) -> str:
+        return "http://127.0.0.1:{}/store".format(self.server_port)
+
+
+class StoreHandler(http.server.BaseHTTPRequestHandler):
+    def __answer(self, default: int) -> None:
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+
+        with self.server.lock:
+            status = self.server.statuses.pop(0) if self.server.statuses else default
+            self.server.requests.append((self.command, self.path, dict(self.headers), body.decode("utf-8"), status))
+
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_POST(self):
+        self.__answer(204)
+
+    def do_DELETE(self):
+        self.__answer(404)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def store():
+    server = Store()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+def lines(count: int) -> list[str]:
+    return ["<https://example.org/s/{}> <https://example.org/p> \"{}\" .\n".format(i, i) for i in range(count)]
+
+
+def test_upload_in_gzipped_batches(store):
+    triples = lines(23)
+
+    stats = Uploader(store.endpoint, graph="https://example.org/g", batch_size=5, workers=2).upload(triples)
+
+    assert stats["batches"] == 5
+    assert stats["triples"] == 23
+    assert stats["bytes"] == len("".join(triples).encode("utf-8"))
+
+    assert {method for method, *_ in store.requests} == {"POST"}
+    assert {path for _, path, *_ in store.requests} == {"/store?graph=https%3A%2F%2Fexample.org%2Fg"}
+    assert all(headers["Content-Encoding"] == "gzip" for _, _, headers, *_ in store.requests)
+    assert all(headers["Content-Type"].startswith("application/n-triples") for _, _, headers, *_ in store.requests)
+    assert sorted(len(body.splitlines()) for _, _, _, body, _ in store.requests) == [3, 5, 5, 5, 5]
+    assert sorted(line for *_, body, _ in store.requests for line in body.splitlines(True)) == sorted(triples)
+
+
+def test_upload_without_gzip_to_default_graph(store):
+    Uploader(store.endpoint, gzip=False).upload(lines(3))
+
+    (method, path, headers, body, status), = store.requests
+    assert path == "/store?default"
+    assert "Content-Encoding" not in headers
+    assert body == "".join(lines(3))
+
+
+def test_upload_retries_server_errors(store):
+    store.statuses = [503, 503]
+
+    stats = Uploader(store.endpoint, batch_size=10, backoff=0.01).upload(lines(10))
+
+    assert stats["batches"] == 1
+    assert [status for *_, status in store.requests] == [503, 503, 204]
+
+
+def test_upload_fails_after_retries(store):
+    store.statuses = [503] * 3
+
+    with pytest.raises(UploadError):
+        Uploader(store.endpoint, retries=2, backoff=0.01).upload(lines(1))
+
+    assert len(store.requests) == 3
+
+
+def test_upload_does_not_retry_client_errors(store):
+    store.statuses = [400]
+
+    with pytest.raises(UploadError):
+        Uploader(store.endpoint, backoff=0.01).upload(lines(1))
+
+    assert len(store.requests) == 1
+
+
+def test_upload_replace_deletes_graph_first(store):
+    Uploader(store.endpoint, graph="https://example.org/g", replace=True).upload(lines(2))
+
+    assert [(method, status) for method, _, _, _, status in store.requests] == [("DELETE", 404), ("POST", 204)]
+    assert store.requests[0][1] == store.requests[1][1]